@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+    Plexer Benchmarks
+    ~~~~~~~~~~~~~~~~~
+
+    Synthetic corpora and a runner that measures tokenizing throughput and
+    peak memory, and compares the results against a stored baseline.
+
+        python -m benchmarks --output results.json
+        python -m benchmarks --baseline results.json
+
+    :license: MIT, see LICENSE for more details.
+"""
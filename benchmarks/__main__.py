@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+    Benchmark Runner
+    ~~~~~~~~~~~~~~~~
+
+    Times `tokenize` (to dicts, to a `TokenArray`, and to a `TokenArray`
+    on several processes) and `tokenize_lines` over each corpus, for every
+    registered lexer and engine, and reports tokens/sec, MB/sec and peak
+    memory.  Results are written as JSON; given a baseline from an earlier
+    run, any measurement that got worse by more than `--tolerance` is
+    reported and the exit status is 1.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import plexer
+from benchmarks import corpus
+
+# worker processes for 'tokenize_parallel'; compare it with 'tokenize_array'.
+JOBS = max(2, os.cpu_count() or 1)
+
+FUNCTIONS = {
+    'tokenize': plexer.tokenize,
+    'tokenize_lines': lambda s, lexer, engine:
+        plexer.tokenize_lines(s, lexer=lexer, engine=engine),
+    'tokenize_array': lambda s, lexer, engine:
+        plexer.tokenize(s, lexer, engine, 'array'),
+    'tokenize_parallel': lambda s, lexer, engine:
+        plexer.tokenize(s, lexer, engine, 'array', jobs=JOBS),
+}
+
+ENGINES = ['python', 'regex']
+try:
+    import numpy
+    ENGINES.append('numpy')
+except ImportError:
+    pass
+
+def lexers():
+    """Return (name, extension) for each distinct registered lexer, named
+    after all the extensions it's registered for."""
+    extensions = {}
+    for ext in sorted(plexer.LEXERS):
+        extensions.setdefault(id(plexer.LEXERS[ext]), []).append(ext)
+    return sorted((','.join(exts), exts[0]) for exts in extensions.values())
+
+def count_tokens(result):
+    if result and isinstance(result[0], list):
+        return sum(len(line) for line in result)
+    return len(result)
+
+def measure(function, s, lexer, engine, repeat):
+    """Return the best time of `repeat` calls, the token count and the
+    peak memory allocated by one call."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(s, lexer, engine)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    tokens = count_tokens(result)
+    del result
+
+    # tracing slows everything down, so memory is measured separately.
+    tracemalloc.start()
+    try:
+        function(s, lexer, engine)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, tokens, peak
+
+def run(size, repeat, corpora, functions, engines, lexer_names, log):
+    results = []
+    for corpus_name in corpora:
+        s = corpus.generate(corpus_name, size)
+        megabytes = len(s.encode('utf-8')) / (1 << 20)
+        for lexer_name, ext in lexers():
+            if lexer_names and not set(lexer_names) & set(lexer_name.split(',')):
+                continue
+            for function_name in functions:
+                for engine in engines:
+                    elapsed, tokens, peak = measure(
+                        FUNCTIONS[function_name], s, ext, engine, repeat)
+                    result = {
+                        'corpus': corpus_name,
+                        'lexer': lexer_name,
+                        'function': function_name,
+                        'engine': engine,
+                        'chars': len(s),
+                        'tokens': tokens,
+                        'seconds': elapsed,
+                        'tokens_per_sec': tokens / elapsed,
+                        'mb_per_sec': megabytes / elapsed,
+                        'peak_bytes': peak,
+                    }
+                    results.append(result)
+                    log(format_result(result))
+    return results
+
+def format_result(result):
+    return '%-12s %-14s %-14s %-7s %9.0f tok/s %7.2f MB/s %8.1f MB peak' % (
+        result['corpus'], result['lexer'], result['function'],
+        result['engine'], result['tokens_per_sec'], result['mb_per_sec'],
+        result['peak_bytes'] / (1 << 20))
+
+def _key(result):
+    return (result['corpus'], result['lexer'], result['function'],
+            result['engine'])
+
+def compare(results, baseline, tolerance):
+    """Return a message for each result that is slower, or uses more
+    memory, than its baseline by more than `tolerance` (a fraction)."""
+    previous = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None or old['chars'] != result['chars']:
+            # not measured, or measured on a different corpus.
+            continue
+        name = '/'.join(_key(result))
+        if result['tokens_per_sec'] < old['tokens_per_sec'] * (1 - tolerance):
+            regressions.append('%s: %.0f tok/s, was %.0f' % (
+                name, result['tokens_per_sec'], old['tokens_per_sec']))
+        if result['peak_bytes'] > old['peak_bytes'] * (1 + tolerance):
+            regressions.append('%s: %d bytes peak, was %d' % (
+                name, result['peak_bytes'], old['peak_bytes']))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Measure plexer throughput and memory.')
+    parser.add_argument('--size', type=int, default=1 << 18,
+                        help='characters per corpus (default: %(default)s); '
+                             "'huge' is " + str(corpus.HUGE_FACTOR) +
+                             ' times larger')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per measurement, the best is kept')
+    parser.add_argument('--corpus', action='append', choices=corpus.names(),
+                        help='corpus to run (default: all); may be repeated')
+    parser.add_argument('--function', action='append', choices=list(FUNCTIONS),
+                        help='function to time (default: all)')
+    parser.add_argument('--engine', action='append', choices=ENGINES,
+                        help='engine to time (default: all)')
+    parser.add_argument('--lexer', action='append',
+                        help='only lexers registered for this extension')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed slowdown or growth (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    log = lambda line: print(line, file=sys.stderr)
+    results = run(args.size, args.repeat,
+                  args.corpus or corpus.names(),
+                  args.function or list(FUNCTIONS),
+                  args.engine or ENGINES,
+                  args.lexer, log)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'size': args.size,
+        'repeat': args.repeat,
+        'jobs': JOBS,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION: ' + regression)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+    Benchmark Corpora
+    ~~~~~~~~~~~~~~~~~
+
+    Generates reproducible synthetic C sources, each stressing one part of
+    the lexer.  The same `size` and `seed` always give the same text.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import random
+
+KEYWORDS = ['int', 'char', 'void', 'return', 'if', 'else', 'for', 'while',
+            'static', 'const', 'struct', 'unsigned', 'sizeof']
+
+def _identifier(rng):
+    length = rng.randint(1, 12)
+    first = rng.choice('abcdefghijklmnopqrstuvwxyz_')
+    rest = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz_0123456789')
+                   for _ in range(length - 1))
+    return first + rest
+
+def _fill(size, seed, line):
+    """Join lines from `line(rng)` until there are at least `size`
+    characters."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        text = line(rng)
+        parts.append(text)
+        total = total + len(text)
+    return ''.join(parts)
+
+def identifiers(size, seed=0):
+    """Declarations and calls: mostly identifiers, whitespace and
+    punctuation."""
+    def line(rng):
+        names = [_identifier(rng) for _ in range(rng.randint(1, 6))]
+        return '    ' + rng.choice(KEYWORDS) + ' ' + names[0] + ' = ' + \
+            names[-1] + '(' + ', '.join(names[1:]) + ');\n'
+    return _fill(size, seed, line)
+
+def comments(size, seed=0):
+    """Long block comments with a little code between them."""
+    def line(rng):
+        words = ' '.join(_identifier(rng) for _ in range(rng.randint(200, 400)))
+        return '/*\n * ' + words.replace(' ', '\n * ', 20) + '\n */\nint ' + \
+            _identifier(rng) + ';\n'
+    return _fill(size, seed, line)
+
+def strings(size, seed=0):
+    """Long string literals, some with escaped quotes."""
+    def line(rng):
+        words = ' '.join(_identifier(rng) for _ in range(rng.randint(20, 200)))
+        if rng.random() < 0.3:
+            words = words.replace(' ', ' \\"', 1)
+        return 'const char *' + _identifier(rng) + ' = "' + words + '";\n'
+    return _fill(size, seed, line)
+
+def numbers(size, seed=0):
+    """Numeric tables in decimal, hex and floating point."""
+    def literal(rng):
+        kind = rng.randint(0, 3)
+        if kind == 0:
+            return str(rng.randint(-100000, 100000))
+        if kind == 1:
+            return hex(rng.randint(0, 1 << 32))
+        if kind == 2:
+            return repr(rng.uniform(-1000, 1000))
+        return str(rng.randint(0, 1 << 16)) + 'u'
+    def line(rng):
+        return '    ' + ', '.join(literal(rng) for _ in range(12)) + ',\n'
+    return _fill(size, seed, line)
+
+def crlf(size, seed=0):
+    """Mixed code with Windows line endings."""
+    return mixed(size, seed).replace('\n', '\r\n')
+
+def mixed(size, seed=0):
+    """A blend of the other corpora, in chunks of about 1KB."""
+    generators = [identifiers, comments, strings, numbers]
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        text = rng.choice(generators)(1024, rng.randint(0, 1 << 30))
+        parts.append(text)
+        total = total + len(text)
+    return ''.join(parts)
+
+# name -> generator(size, seed).  'huge' is `mixed` at many times the
+# requested size.
+CORPORA = {
+    'identifiers': identifiers,
+    'comments': comments,
+    'strings': strings,
+    'numbers': numbers,
+    'crlf': crlf,
+    'mixed': mixed,
+}
+
+HUGE_FACTOR = 16
+
+def generate(name, size, seed=0):
+    """Return the corpus called `name`, about `size` characters long."""
+    if name == 'huge':
+        return mixed(size * HUGE_FACTOR, seed)
+    return CORPORA[name](size, seed)
+
+def names():
+    return list(CORPORA) + ['huge']
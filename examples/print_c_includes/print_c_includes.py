@@ -9,17 +9,12 @@
     :license: MIT, see LICENSE for more details.
 """
 import plexer
-from plexer import TYPE, tokenize_lines
+from plexer.includes import scan_directives
 
 def print_includes(s):
-    lines = tokenize_lines(s, 'c')
-    for line in lines:
-        if line:
-            if line[0]['value'] == '#include':
-                p = ''
-                for token in line:
-                    p = p + token['value']
-                print(p)
+    for directive in scan_directives(s):
+        if directive['name'] == 'include':
+            print(directive['text'])
 
 if __name__ == '__main__':
     import sys
@@ -0,0 +1,2468 @@
+import os
+import re
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+
+# constants.
+class TYPE:
+    NEWLINE     = 0
+    WHITESPACE  = 1
+    COMMENT     = 2
+    NUMBER      = 3
+    STRING      = 4
+    SPECIAL     = 5 # special language characters such as { } [ ] + - * / etc
+    IDENTIFIER  = 6
+    ERROR       = 7 # an unterminated comment or string, when recovering
+
+TYPE_NAMES = {
+    TYPE.NEWLINE: 'newline',
+    TYPE.WHITESPACE: 'whitespace',
+    TYPE.COMMENT: 'comment',
+    TYPE.NUMBER: 'number',
+    TYPE.STRING: 'string',
+    TYPE.SPECIAL: 'special',
+    TYPE.IDENTIFIER: 'identifier',
+    TYPE.ERROR: 'error'
+}
+
+# part of every `Lexer.fingerprint`; bump it whenever a change to plexer
+# itself changes the tokens a lexer produces.
+FINGERPRINT_VERSION = 1
+
+# member variables.
+LEXERS = { }
+
+#-------------------
+# register_lexer(some_lexer, ['ext1', 'ext2'])
+#-------------------
+def register_lexer(file_extensions, lexer):
+    """Associate a lexer with a list of file extensions."""
+
+    if isinstance(file_extensions, str):
+        file_extensions = [file_extensions]
+
+    for ext in file_extensions:
+        if LEXERS.get(ext):
+            print('WARNING: LEXERS[' + ext + '] is being replaced.')
+        LEXERS[ext] = lexer
+
+# alias.
+add_lexer = register_lexer
+
+def point(ctx: dict, s: str):
+    return ctx['pos']
+
+def line(ctx: dict, s: str):
+    pt = point(ctx, s)
+    if ctx.get('lines') is not None:
+        return ctx['lines'].line(pt)
+    if not isinstance(s, str):
+        # bytes, bytearray, memoryview, mmap, ...: only the lines before
+        # `pt` are indexed.
+        return LineIndex(memoryview(s)[:pt]).line(pt)
+    return 1 + s.count('\n', 0, pt)
+
+def column(ctx: dict, s: str):
+    pt = point(ctx, s)
+    if ctx.get('lines') is not None:
+        return ctx['lines'].column(pt)
+    if not isinstance(s, str):
+        return LineIndex(memoryview(s)[:pt]).column(pt)
+    return pt - s.rfind('\n', 0, pt)
+
+#==============================================================================
+# LineIndex
+#==============================================================================
+class LineIndex:
+    """Maps offsets into an input to line and column numbers.
+
+    The offset at which each line starts is found once, after which every
+    lookup is a binary search.  Lines end with '\n', which includes '\r\n'.
+    """
+
+    def __init__(self, s):
+        starts = array('I', [0])
+        if isinstance(s, str):
+            find = s.find
+            i = find('\n')
+            while i >= 0:
+                starts.append(i + 1)
+                i = find('\n', i + 1)
+        else:
+            # bytes, bytearray, memoryview, mmap, ...
+            starts.extend(m.end() for m in _BINARY_NEWLINE.finditer(s))
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line(self, pos):
+        return bisect_right(self.starts, pos)
+
+    def column(self, pos):
+        return pos - self.starts[bisect_right(self.starts, pos) - 1] + 1
+
+    def position(self, pos):
+        """Return the (line, column) of `pos`."""
+        line = bisect_right(self.starts, pos)
+        return line, pos - self.starts[line - 1] + 1
+
+    def edit(self, offset, removed_len, inserted):
+        """Return the index of the input after replacing `removed_len`
+        characters at `offset` with `inserted`."""
+        starts = self.starts
+        head = bisect_right(starts, offset)
+        tail = bisect_left(starts, offset + removed_len + 1)
+        delta = len(inserted) - removed_len
+
+        new_starts = starts[:head]
+        new_starts.extend(offset + start for start in LineIndex(inserted).starts[1:])
+        new_starts.extend(map(delta.__add__, starts[tail:]))
+
+        index = LineIndex('')
+        index.starts = new_starts
+        return index
+
+# larger than any offset.
+_NO_LINE = 1 << 62
+
+_BINARY_NEWLINE = re.compile(b'\n')
+
+def _locate(spans, index):
+    """Add line and column numbers to (type, start, end) spans."""
+    starts = index.starts
+    count = len(starts)
+    line = 1
+    line_start = 0
+    next_start = starts[1] if count > 1 else _NO_LINE
+    for type, start, end in spans:
+        if start >= next_start:
+            line = bisect_right(starts, start)
+            line_start = starts[line - 1]
+            next_start = starts[line] if line < count else _NO_LINE
+        yield (type, start, end, line, start - line_start + 1)
+
+#==============================================================================
+# LexError
+#==============================================================================
+class LexError(Exception):
+
+    def __init__(self, msg, ctx: dict, s: str):
+        super().__init__(msg)
+        self.msg = msg
+        self.ctx = dict(ctx)
+        # the errors recovered from so far aren't part of the context.
+        self.ctx.pop('diagnostics', None)
+        self.s = s
+        if ctx.get('lines') is not None:
+            self.ctx['line'], self.ctx['column'] = \
+                ctx['lines'].position(point(ctx, s))
+        # number of lines preceding `s` when it is only part of the input,
+        # and of characters preceding it on its first line.
+        self.line_offset = 0
+        self.column_offset = 0
+
+    def __reduce__(self):
+        return (LexError, (self.msg, self.ctx, self.s), self.__dict__)
+
+    @property
+    def row(self):
+        return line(self.ctx, self.s) + self.line_offset
+
+    @property
+    def col(self):
+        col = column(self.ctx, self.s)
+        if line(self.ctx, self.s) == 1:
+            col = col + self.column_offset
+        return col
+
+
+
+#==============================================================================
+# LexNothing:
+#==============================================================================
+class LexNothing:
+    pattern = None
+    first_chars = ''
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+        return 0
+
+
+#==============================================================================
+# LexNewline:
+#==============================================================================
+class LexNewline:
+    """Lex a newline."""
+
+    pattern = r'\r\n|\n'
+    first_chars = '\r\n'
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+
+        # UNIX-style newline.
+        if s[idx] == '\n':
+            return 1
+
+        # Windows-style newline.
+        if s[idx] == '\r':
+            if idx + 1 < end:
+                if s[idx+1] == '\n':
+                    return 2
+
+        return 0
+
+#==============================================================================
+# LexWhitespace:
+#==============================================================================
+class LexWhitespace:
+    """Lex whitespace."""
+
+    pattern = r'[ \t]'
+    first_chars = ' \t'
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+        if s[idx] == ' ' or \
+           s[idx] == '\t':
+            return 1
+        return 0
+
+#==============================================================================
+# LexWhitespaceRun:
+#==============================================================================
+class LexWhitespaceRun:
+    """Lex a run of whitespace as one token."""
+
+    pattern = r'[ \t]+'
+    first_chars = ' \t'
+
+    _run = re.compile(pattern)
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+        m = LexWhitespaceRun._run.match(s, idx, end)
+        if m is None:
+            return 0
+        return m.end() - idx
+
+#==============================================================================
+# LexOperators:
+#==============================================================================
+class LexOperators:
+    """Lex the longest operator of a `Lexer`'s `operators` that matches, or
+    else one of its `special_chars`.  Stands in for `special_chars` when a
+    lexer has operators.
+    """
+
+    def __init__(self, lexer):
+        # longest first, and in a fixed order, as they are fingerprinted.
+        operators = sorted(set(lexer.operators), key=lambda op: (-len(op), op))
+        longer = [op for op in operators if len(op) > 1]
+        single = set(lexer.special_chars)
+        single.update(op for op in operators if len(op) == 1)
+        self.operators = tuple(operators)
+        self.special_chars = ''.join(sorted(single))
+
+        # longer operators, longest first, by their first character.
+        self._longer = {}
+        for op in longer:
+            self._longer.setdefault(op[0], []).append(op)
+        self._single = frozenset(single)
+        self.first_chars = ''.join(sorted(single | set(self._longer)))
+        # the characters that are always a token by themselves.
+        self.single_chars = ''.join(sorted(single - set(self._longer)))
+        self.pattern = '|'.join([re.escape(op) for op in longer] +
+                                [_char_class(self.special_chars)])
+
+    def lex(self, s, idx, end, ctx):
+        for op in self._longer.get(s[idx], ()):
+            if s.startswith(op, idx, end):
+                return len(op)
+        if s[idx] in self._single:
+            return 1
+        return 0
+
+#==============================================================================
+# Lexer
+#==============================================================================
+class Lexer:
+    """Determines how to divide the input stream into tokens.
+
+    Each of `special_chars` is a SPECIAL token by itself, unless it starts
+    one of `operators`: then the longest operator that matches is one
+    SPECIAL token (see `C_OPERATORS`).  Every space or tab is a WHITESPACE
+    token by itself, unless `coalesce_whitespace` is true, in which case a
+    whole run of them is one.
+    """
+
+    # for subclasses that set the other attributes without calling
+    # __init__.
+    operators = ()
+    coalesce_whitespace = False
+
+    # the tables compiled by `_cached` and what they were compiled for.
+    _cache_key = None
+
+    def __init__(self, 
+                 lex_comment=LexNothing,
+                 lex_number=LexNothing,
+                 lex_string=LexNothing,
+                 special_chars='',
+                 identifier_chars='',
+                 operators=(),
+                 coalesce_whitespace=False):
+        self.lex_comment = lex_comment
+        self.lex_number = lex_number
+        self.lex_string = lex_string
+        self.special_chars = special_chars
+        self.identifier_chars = identifier_chars
+        self.operators = tuple(operators)
+        self.coalesce_whitespace = coalesce_whitespace
+
+    def __getstate__(self):
+        # the compiled tables are rebuilt on demand.
+        state = dict(self.__dict__)
+        state.pop('_cache_key', None)
+        state.pop('_cache', None)
+        return state
+
+    def copy(self, **options):
+        """Return a new lexer like this one, with the given constructor
+        arguments changed, such as
+        `get_lexer('c').copy(operators=C_OPERATORS)`."""
+        args = {'lex_comment': self.lex_comment,
+                'lex_number': self.lex_number,
+                'lex_string': self.lex_string,
+                'special_chars': self.special_chars,
+                'identifier_chars': self.identifier_chars,
+                'operators': self.operators,
+                'coalesce_whitespace': self.coalesce_whitespace}
+        args.update(options)
+        return type(self)(**args)
+
+    def _cached(self, name, build):
+        key = (self.lex_comment, self.lex_number, self.lex_string,
+               self.special_chars, self.operators, self.coalesce_whitespace)
+        if key != self._cache_key:
+            self._cache = {}
+            self._cache_key = key
+        if name not in self._cache:
+            self._cache[name] = build(self)
+        return self._cache[name]
+
+    def dispatch(self):
+        """Return the first-character dispatch table of the lexer.
+
+        Returns (table, default, identifier).  `table` maps a character to
+        the (type, lex) pairs that can match there, in the order `tokenize`
+        tries them; every other character uses `default`.  A sub-lexer
+        without `first_chars` may match anywhere, so it appears in every
+        entry.  `identifier` matches the rest of an identifier once its
+        first character is known, or is None if an undeclared sub-lexer
+        makes that impossible.
+        """
+        return self._cached('dispatch', _dispatch_lexer)
+
+    def fingerprint(self):
+        """Return a hex digest identifying how this lexer divides input.
+
+        Covers the class, patterns, first characters and code (bytecode,
+        constants and names) of each sub-lexer along with `special_chars`,
+        `identifier_chars` and `FINGERPRINT_VERSION`, so it changes whenever
+        the tokens it produces might.
+        """
+        import hashlib
+        h = hashlib.sha1(b'plexer %d' % FINGERPRINT_VERSION)
+        for type, sublexer in _sublexers(self):
+            h.update(repr(type).encode())
+            if isinstance(sublexer, str):
+                h.update(sublexer.encode('utf-8', 'surrogatepass'))
+                continue
+            if isinstance(sublexer, LexOperators):
+                h.update(repr((sublexer.operators,
+                               sublexer.special_chars)).encode(
+                                   'utf-8', 'surrogatepass'))
+                continue
+            error_patterns = getattr(sublexer, 'error_patterns', None)
+            if error_patterns:
+                error_patterns = [(_pattern_text(pattern), msg)
+                                  for pattern, msg in error_patterns]
+            h.update(repr((sublexer.__module__,
+                           sublexer.__qualname__,
+                           _pattern_text(getattr(sublexer, 'pattern', None)),
+                           error_patterns,
+                           getattr(sublexer, 'first_chars', None))).encode(
+                               'utf-8', 'surrogatepass'))
+            code = getattr(sublexer.lex, '__code__', None)
+            if code is not None:
+                _hash_code(h, code)
+        h.update(repr(self.identifier_chars).encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def compile(self):
+        """Compile the lexer into a single alternation regex.
+
+        Every sub-lexer contributes its `pattern` (and any `error_patterns`)
+        in the same order `tokenize` tries them, and whatever is left over
+        is matched as a run of identifier characters.  The result is cached
+        until one of the sub-lexers or `special_chars` changes.  Returns None
+        if some sub-lexer has no `pattern`, in which case the lexer can only
+        be driven by the python engine.
+        """
+        return self._cached('compile', _compile_lexer)
+
+    def compile_binary(self):
+        """Like `compile`, but the regex matches bytes-like inputs, which are
+        treated as latin-1.  Returns None if the lexer can't be compiled or
+        uses characters outside latin-1."""
+        return self._cached('compile_binary',
+                            lambda lexer: _compile_lexer(lexer, True))
+
+
+def _lex_special(s, idx, end, ctx):
+    return 1
+
+def _pattern_text(pattern):
+    # the repr of a compiled regex is cut short; use its source instead.
+    return getattr(pattern, 'pattern', pattern)
+
+def _hash_code(h, code):
+    """Add a code object's bytecode, names and constants to the hash `h`,
+    including those of the functions and classes defined inside it."""
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _hash_code(h, const)
+        elif isinstance(const, frozenset):
+            # the order a set repr()s in varies between runs.
+            h.update(repr(sorted(const, key=repr)).encode(
+                'utf-8', 'surrogatepass'))
+        else:
+            h.update(repr(const).encode('utf-8', 'surrogatepass'))
+
+def _sublexers(lexer):
+    """Return (type, sublexer) pairs in the order `tokenize` tries them."""
+    special = LexNothing
+    if lexer.operators:
+        special = lexer._cached('operators', LexOperators)
+    elif lexer.special_chars:
+        special = lexer.special_chars
+    whitespace = LexWhitespace
+    if lexer.coalesce_whitespace:
+        whitespace = LexWhitespaceRun
+    return ((TYPE.COMMENT, lexer.lex_comment),
+            (TYPE.NEWLINE, LexNewline),
+            (TYPE.WHITESPACE, whitespace),
+            (TYPE.SPECIAL, special),
+            (TYPE.NUMBER, lexer.lex_number),
+            (TYPE.STRING, lexer.lex_string))
+
+def _dispatch_lexer(lexer):
+    entries = []
+    for type, sublexer in _sublexers(lexer):
+        if sublexer is LexNothing:
+            continue
+        if isinstance(sublexer, str):
+            entries.append((type, sublexer, _lex_special))
+        elif isinstance(sublexer, LexOperators):
+            # only characters that may start a longer operator need it.
+            entries.append((type, sublexer.single_chars, _lex_special))
+            entries.append((type, ''.join(sorted(sublexer._longer)),
+                            sublexer.lex))
+        else:
+            entries.append((type, getattr(sublexer, 'first_chars', None),
+                            sublexer.lex))
+
+    default = tuple((type, lex) for type, first_chars, lex in entries
+                    if first_chars is None)
+    table = {}
+    for type, first_chars, lex in entries:
+        for c in first_chars or '':
+            table[c] = tuple((t, l) for t, f, l in entries
+                             if f is None or c in f)
+
+    identifier = None
+    if not default:
+        identifier = re.compile(_char_class(_stop_chars(table), True) + '*')
+    return table, default, identifier
+
+def _stop_chars(table):
+    """Return the characters that can end an identifier.  Numbers aren't
+    lexed in the middle of an identifier, so characters that can only start
+    a number continue one."""
+    return ''.join(sorted(c for c, pairs in table.items()
+                          if any(type != TYPE.NUMBER for type, lex in pairs)))
+
+def _char_class(chars, negate=False):
+    if not chars:
+        return r'[\s\S]' if negate else r'(?!)'
+    return (('[^' if negate else '[') +
+            ''.join(re.escape(c) for c in chars) + ']')
+
+
+def _compile_lexer(lexer, binary=False):
+    alternatives = []
+    errors = []
+
+    for type, sublexer in _sublexers(lexer):
+        if sublexer is LexNothing:
+            continue
+        if isinstance(sublexer, str):
+            alternatives.append((type, 'T%d' % type, _char_class(sublexer)))
+            continue
+        pattern = getattr(sublexer, 'pattern', None)
+        if pattern is None:
+            return None
+        alternatives.append((type, 'T%d' % type, pattern))
+        for error_pattern, msg in getattr(sublexer, 'error_patterns', ()):
+            alternatives.append((type, 'E%d' % len(errors), error_pattern))
+            errors.append(msg)
+
+    # an identifier grows until another token could start; numbers are not
+    # lexed in the middle of an identifier.
+    stop = '|'.join('(?:' + pattern + ')'
+                    for type, name, pattern in alternatives
+                    if type != TYPE.NUMBER)
+    identifier = r'[\s\S](?:(?!' + stop + r')[\s\S])*'
+
+    # when every sub-lexer declares its first characters, only those need
+    # the lookahead.
+    table, default, rest = lexer.dispatch()
+    if rest is not None:
+        chars = _stop_chars(table)
+        identifier = (r'[\s\S](?:' + _char_class(chars, True) + '+' +
+                      '|(?!' + stop + ')' + _char_class(chars) + ')*')
+    alternatives.append((TYPE.IDENTIFIER, 'T%d' % TYPE.IDENTIFIER, identifier))
+    regex = '|'.join('(?P<' + name + '>' + pattern + ')'
+                     for type, name, pattern in alternatives)
+    if binary:
+        try:
+            regex = regex.encode('latin-1')
+        except UnicodeEncodeError:
+            return None
+    regex = re.compile(regex)
+
+    # map each group index to its token type, or to -1 - n for the nth error.
+    kinds = [None] * (regex.groups + 1)
+    for name, index in regex.groupindex.items():
+        if name[0] == 'T':
+            kinds[index] = int(name[1:])
+        else:
+            kinds[index] = -1 - int(name[1:])
+    return regex, tuple(kinds), tuple(errors)
+
+#******************************************************************************
+# Basic Lexer
+#******************************************************************************
+
+#==============================================================================
+# LexBasicNumber
+#==============================================================================
+
+class LexBasicNumber:
+    """Lex an integer, decimal, or decimal + exponent.  Examples:
+
+        2
+        .9
+        .9e2
+        -42
+    """
+
+    pattern = (r'-?(?:[0-9]*\.[0-9]+(?:[eE]-?[0-9]+)?'
+               r'|[0-9]+\.'
+               r'|[0-9]+(?:[eE]-?[0-9]+)?)')
+    first_chars = '-.0123456789'
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+        start = idx
+        num_digits = 0
+        num_decimals = 0
+        decimal_idx = None
+        is_integer = True
+
+        # skip over the negation.
+        if s[idx] == '-':
+            idx = idx + 1
+
+        # skip over the integer component.
+        num_start = idx
+        while idx < end and s[idx] >= '0' and s[idx] <= '9':
+            idx = idx + 1
+        num_digits = idx - num_start
+
+        # skip over the decimal component.
+        if idx < end and s[idx] == '.':
+
+            # skip the decimal character.
+            is_integer = False
+            decimal_idx = idx
+            idx = idx + 1
+
+            # skip the decimal numbers.
+            num_start = idx
+            while idx < end and s[idx] >= '0' and s[idx] <= '9':
+                idx = idx + 1
+            num_decimals = idx - num_start
+            num_digits = num_digits + num_decimals
+
+        # if we have no digits, then abort.
+        if num_digits == 0:
+            return 0
+
+        # do we have an exponent?
+        if idx < end and (s[idx] == 'e' or s[idx] == 'E'):
+
+            # we must either have no decimal character or at least one
+            # decimal digit to have an exponent.
+            if decimal_idx == None or num_decimals > 0:
+
+                # save the starting index of the exponent.
+                exp_start = idx
+
+                # skip over the exponent character.
+                idx = idx + 1
+
+                # skip over the exponent negation.
+                if idx < end and s[idx] == '-':
+                    idx = idx + 1
+
+                # skip over the exponent integer.
+                num_start = idx
+                while idx < end and s[idx] >= '0' and s[idx] <= '9':
+                    idx = idx + 1
+
+                # if there is no exponent integer, then there is no exponent,
+                # so rewind.
+                if idx - num_start <= 0:
+                    idx = exp_start
+                else:
+                    # otherwise, there is an actual exponent, so we are no
+                    # longer an integer.
+                    is_integer = False
+
+        return idx - start
+
+# associate the basic lexer with various filetypes.
+add_lexer(
+    ['', 'txt'],
+    Lexer(lex_number=LexBasicNumber))
+
+#******************************************************************************
+# C lexer
+#******************************************************************************
+
+#==============================================================================
+# LexCComment
+#==============================================================================
+class LexCComment:
+    """Lex a C comment."""
+
+    pattern = r'//(?:[^\r\n]|\r(?!\n))*|/\*[\s\S]*?\*/'
+    error_patterns = ((r'/\*', "Unterminated C block comment"),)
+    first_chars = '/'
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+
+        if s[idx] != '/':
+            return 0
+
+        if idx + 1 >= end:
+            return 0
+
+        # C line comment: runs up to the newline.
+        if s[idx+1] == '/':
+            eol = s.find('\n', idx + 2, end)
+            if eol < 0:
+                return end - idx
+            # a Windows-style newline isn't part of the comment.
+            if s[eol-1] == '\r':
+                eol = eol - 1
+            return eol - idx
+
+        # C block comment: runs up to the first */.
+        if s[idx+1] == '*':
+            close = s.find('*/', idx + 2, end)
+            if close < 0:
+                # if we couldn't find the termination of the block comment,
+                # then raise an exception.
+                raise LexError("Unterminated C block comment", ctx, s)
+            return close + 2 - idx
+
+        return 0
+
+#==============================================================================
+# LexCNumber
+#==============================================================================
+
+class LexCNumber:
+    """Lex a C integer, float, or double literal.  Examples:
+
+        2
+        .9f or .9F
+        .9e2 or .9E2
+        2.5e-3f
+        -51UL (yes, this is valid C)
+    """
+
+    pattern = (r'-?(?:[0-9]*\.[0-9]+(?:[eE]-?[0-9]+)?[fF]?'
+               r'|[0-9]+\.[fF]?'
+               r'|[0-9]+[eE]-?[0-9]+[fF]?'
+               r'|[0-9]+[uU]?[lL]?)')
+    first_chars = '-.0123456789'
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+        start = idx
+        num_digits = 0
+        num_decimals = 0
+        decimal_idx = None
+        is_integer = True
+
+        # skip over the negation.
+        if s[idx] == '-':
+            idx = idx + 1
+
+        # skip over the integer component.
+        num_start = idx
+        while idx < end and s[idx] >= '0' and s[idx] <= '9':
+            idx = idx + 1
+        num_digits = idx - num_start
+
+        # skip over the decimal component.
+        if idx < end and s[idx] == '.':
+
+            # skip the decimal character.
+            is_integer = False
+            decimal_idx = idx
+            idx = idx + 1
+
+            # skip the decimal numbers.
+            num_start = idx
+            while idx < end and s[idx] >= '0' and s[idx] <= '9':
+                idx = idx + 1
+            num_decimals = idx - num_start
+            num_digits = num_digits + num_decimals
+
+        # if we have no digits, then abort.
+        if num_digits == 0:
+            return 0
+
+        # do we have an exponent?
+        if idx < end and (s[idx] == 'e' or s[idx] == 'E'):
+
+            # we must either have no decimal character or at least one
+            # decimal digit to have an exponent.
+            if decimal_idx == None or num_decimals > 0:
+
+                # save the starting index of the exponent.
+                exp_start = idx
+
+                # skip over the exponent character.
+                idx = idx + 1
+
+                # skip over the exponent negation.
+                if idx < end and s[idx] == '-':
+                    idx = idx + 1
+
+                # skip over the exponent integer.
+                num_start = idx
+                while idx < end and s[idx] >= '0' and s[idx] <= '9':
+                    idx = idx + 1
+
+                # if there is no exponent integer, then there is no exponent,
+                # so rewind.
+                if idx - num_start <= 0:
+                    idx = exp_start
+                else:
+                    # otherwise, there is an actual exponent, so we are no
+                    # longer an integer.
+                    is_integer = False
+
+        if is_integer:
+            # skip the unsigned postfix.
+            if idx < end and (s[idx] == 'u' or s[idx] == 'U'):
+                idx = idx + 1
+
+            # skip the long postfix.
+            if idx < end and (s[idx] == 'l' or s[idx] == 'L'):
+                idx = idx + 1
+        else:
+            # skip the float postfix.
+            if idx < end and (s[idx] == 'f' or s[idx] == 'F'):
+                idx = idx + 1
+
+        return idx - start
+
+#==============================================================================
+# LexCString:
+#==============================================================================
+class LexCString:
+    """Lex a C string."""
+
+    # an opening quote is neither escaped (\") nor a character literal ('"').
+    _open = r'''(?<!\\)(?!(?<=')"')"'''
+    pattern = _open + r'[\s\S]*?(?<!\\)"'
+    error_patterns = ((_open, "String not terminated"),)
+    first_chars = '"'
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+        if s[idx] != '"':
+            return 0
+
+        # catch the following: '\"'
+        if idx > 0:
+            if s[idx-1] == '\\':
+                return 0
+
+        # catch the following: '"'
+        if idx > 0 and idx < end-1:
+            if s[idx-1] == "'" and s[idx+1] == "'":
+                return 0
+
+        # find the closing quote, skipping escaped ones.
+        close = s.find('"', idx + 1, end)
+        while close >= 0:
+            if s[close-1] != '\\':
+                return (close + 1) - idx
+            close = s.find('"', close + 1, end)
+
+        # if no closing quote could be found, raise an exception.
+        raise LexError("String not terminated", ctx, s)
+
+# associate the c lexer with various filetypes.
+add_lexer(['c', 'h', 'cpp', 'hpp'],
+          Lexer(
+              lex_comment=LexCComment,
+              lex_number=LexCNumber,
+              lex_string=LexCString,
+              special_chars=".,:;!=-+/*&<>()[]{}",
+              identifier_chars="_"))
+
+# the C and C++ operators, for `Lexer(operators=...)`.  With them, '->',
+# '<<=', '==' and '::' are one token each rather than several, and the
+# operator characters the C lexer doesn't treat as special (| % ^ ~ ?) are
+# special too:
+#
+#     lexer = get_lexer('cpp').copy(operators=C_OPERATORS)
+C_OPERATORS = (
+    '<<=', '>>=', '...', '->*', '<=>',
+    '->', '++', '--', '<<', '>>', '<=', '>=', '==', '!=', '&&', '||',
+    '+=', '-=', '*=', '/=', '%=', '&=', '^=', '|=', '::', '.*',
+    '|', '%', '^', '~', '?')
+
+#******************************************************************************
+# lexer packs
+#******************************************************************************
+
+#==============================================================================
+# LexerPack
+#==============================================================================
+class LexerPack:
+    """Stands in for a lexer in LEXERS until it is first used.
+
+    `module` is the name of a module defining the lexer as `lexer`; it is
+    only imported, and the lexer only built, when a file extension
+    registered for the pack is looked up.  LEXERS then holds the lexer
+    itself.
+    """
+
+    def __init__(self, module):
+        self.module = module
+
+    def load(self):
+        import importlib
+        lexer = importlib.import_module(self.module).lexer
+        for ext, value in list(LEXERS.items()):
+            if value is self:
+                LEXERS[ext] = lexer
+        return lexer
+
+    def __repr__(self):
+        return '<LexerPack %s>' % self.module
+
+# the lexer packs in plexer.lexers, by name.
+LEXER_PACKS = {}
+
+for _name, _extensions in [
+        ('python', ['py', 'pyw', 'pyi']),
+        ('javascript', ['js', 'mjs', 'cjs', 'jsx']),
+        ('go', ['go']),
+        ('rust', ['rs']),
+        ('shell', ['sh', 'bash', 'zsh', 'ksh']),
+        ('json', ['json'])]:
+    LEXER_PACKS[_name] = LexerPack('plexer.lexers.' + _name)
+    add_lexer(_extensions, LEXER_PACKS[_name])
+
+#******************************************************************************
+# token storage
+#******************************************************************************
+
+#==============================================================================
+# Token
+#==============================================================================
+class Token:
+    """A single token.  Its value is sliced from the source on access, and
+    decoded with `encoding` if the source is bytes-like.
+
+    Supports `token['value']` style access so it can stand in for the token
+    dicts returned by `tokenize`.
+    """
+
+    __slots__ = ('type', 'start', 'end', 'line', 'column', 'source',
+                 'encoding')
+
+    def __init__(self, type, start, end, line, column, source, encoding=None):
+        self.type = type
+        self.start = start
+        self.end = end
+        self.line = line
+        self.column = column
+        self.source = source
+        self.encoding = encoding
+
+    @property
+    def name(self):
+        return TYPE_NAMES[self.type]
+
+    @property
+    def value(self):
+        return _value(self.source, self.start, self.end, self.encoding)
+
+    def __getitem__(self, key):
+        if key in _TOKEN_KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def as_dict(self):
+        return {'type': self.type,
+                'name': self.name,
+                'value': self.value,
+                'line': self.line,
+                'column': self.column}
+
+    def __eq__(self, other):
+        if isinstance(other, Token):
+            other = other.as_dict()
+        return self.as_dict() == other
+
+    def __repr__(self):
+        return 'Token(%s, %r, line=%d, column=%d)' % (
+            self.name, self.value, self.line, self.column)
+
+_TOKEN_KEYS = ('type', 'name', 'value', 'line', 'column')
+
+def _value(source, start, end, encoding):
+    if source is None:
+        return None
+    if encoding is None:
+        value = source[start:end]
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        return value
+    return bytes(source[start:end]).decode(encoding, 'replace')
+
+#==============================================================================
+# TokenArray
+#==============================================================================
+class TokenArray:
+    """Tokens stored as parallel arrays of types, offsets and positions.
+
+    Values aren't stored at all; they are sliced from `source` when a
+    `Token` is looked up.  `index` is the `LineIndex` of `source` and
+    `lexer` the `Lexer` that produced the tokens, when known.  For a
+    bytes-like source, offsets are byte offsets and values are decoded with
+    `encoding`.  `diagnostics` lists the `LexError`s that were recovered
+    from (see `tokenize`), and is None if the tokens were lexed without
+    recovering.  Returned by `tokenize(..., result='array')`.
+    """
+
+    def __init__(self, source, index=None, lexer=None, encoding=None):
+        self.source = source
+        self.index = index
+        self.lexer = lexer
+        self.encoding = encoding
+        self.diagnostics = None
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.columns = array('I')
+
+    def append(self, type, start, end, line, column):
+        self.types.append(type)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def extend(self, spans):
+        """Append (type, start, end, line, column) tuples."""
+        types = self.types.append
+        starts = self.starts.append
+        ends = self.ends.append
+        lines = self.lines.append
+        columns = self.columns.append
+        for type, start, end, line, column in spans:
+            types(type)
+            starts(start)
+            ends(end)
+            lines(line)
+            columns(column)
+
+    def value(self, i):
+        return _value(self.source, self.starts[i], self.ends[i], self.encoding)
+
+    def to_dicts(self):
+        """Return the tokens as the list of dicts `tokenize` returns."""
+        return [token.as_dict() for token in self]
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return Token(self.types[i], self.starts[i], self.ends[i],
+                     self.lines[i], self.columns[i], self.source, self.encoding)
+
+    def __iter__(self):
+        source = self.source
+        encoding = self.encoding
+        for type, start, end, line, column in zip(
+                self.types, self.starts, self.ends, self.lines, self.columns):
+            yield Token(type, start, end, line, column, source, encoding)
+
+    def __repr__(self):
+        return '<TokenArray of %d tokens>' % len(self)
+
+#==============================================================================
+# TokenLines
+#==============================================================================
+class TokenLines:
+    """A sequence of lines over a flat sequence of tokens.
+
+    Rather than copying the tokens into a list per line, only the index of
+    the first and past-the-last token of each line is kept, and `lines[n]`
+    returns a `TokenLine` view of them.  Lines compare equal to the list of
+    lists `tokenize_lines` returns by default.  Returned by
+    `tokenize_lines(..., view=True)`.
+    """
+
+    def __init__(self, tokens, starts, ends):
+        self.tokens = tokens
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self[i] for i in range(*n.indices(len(self)))]
+        return TokenLine(self.tokens, self.starts[n], self.ends[n])
+
+    def __iter__(self):
+        tokens = self.tokens
+        for start, end in zip(self.starts, self.ends):
+            yield TokenLine(tokens, start, end)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return '<TokenLines of %d lines>' % len(self)
+
+class TokenLine:
+    """The tokens tokens[start:end], without copying them."""
+
+    __slots__ = ('tokens', 'start', 'end')
+
+    def __init__(self, tokens, start, end):
+        self.tokens = tokens
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.tokens[self.start + range(len(self))[i]]
+
+    def __iter__(self):
+        tokens = self.tokens
+        for i in range(self.start, self.end):
+            yield tokens[i]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+#******************************************************************************
+# lex
+#******************************************************************************
+
+def _lookup_lexer(ext, ctx, s):
+    if isinstance(ext, Lexer):
+        return ext
+    ext = ext.lower()
+    if not ext in LEXERS:
+        raise LexError("No lexer associated with '" + ext + "', use add_lexer", ctx, s)
+    lexer = LEXERS[ext]
+    if isinstance(lexer, LexerPack):
+        lexer = lexer.load()
+    return lexer
+
+def get_lexer(name):
+    """Return the `Lexer` registered for a file extension, or the lexer
+    pack called `name` ('python', 'rust', ...), importing it if needed."""
+    if name in LEXER_PACKS:
+        return LEXER_PACKS[name].load()
+    return _lookup_lexer(name, {'pos': 0}, '')
+
+def tokenize(s,
+             lexer='cpp',
+             engine='python',
+             result='dict',
+             jobs=1,
+             encoding='utf-8',
+             stats=None,
+             include=None,
+             exclude=None,
+             diagnostics=None):
+    """Divide `s` into tokens.
+
+    `engine` selects how the input is walked: 'python' calls each sub-lexer
+    at every position, 'regex' drives the lexer's compiled alternation regex
+    (see `Lexer.compile`) and produces the same tokens.  Lexers that can't be
+    compiled always use the python engine.  'numpy' classifies characters
+    with array operations and only calls the sub-lexers where a comment,
+    string or number may start (see `_lex_numpy`); it requires numpy,
+    installed with the 'numpy' extra.  It is the fastest engine on code
+    with many short tokens, especially with `result='array'`, which it
+    builds without a Python object per token, but it looks at every
+    character, so on input that is mostly long comments or strings the
+    python engine is faster.
+
+    `result` selects what is returned: 'dict' gives a list of token dicts,
+    'array' gives a compact `TokenArray` over `s`.
+
+    With `jobs` > 1, a large input is split into segments that are lexed
+    concurrently in worker processes (see `_lex_parallel`); the tokens are
+    the same as when lexing sequentially.
+
+    `s` may also be bytes, a bytearray, a memoryview or an mmap.  It is
+    lexed as latin-1 without being decoded, so offsets and columns count
+    bytes, and token values are decoded with `encoding` when they are
+    built.  Use the regex engine to avoid copying the input at all.
+
+    To see where the time goes, pass a `LexStats` as `stats`, or a function
+    to call with one once the input has been tokenized.  The input is then
+    lexed in this process, whatever `jobs` says.
+
+    `include` and `exclude` are collections of `TYPE` values.  Tokens of a
+    type not in `include`, or in `exclude`, are still lexed so that the
+    positions of the rest are right, but are never built.
+
+    An unterminated comment or string raises a `LexError`, unless a list is
+    passed as `diagnostics`.  Then the construct becomes a `TYPE.ERROR`
+    token reaching to the end of its line, the LexError is appended to
+    `diagnostics` and lexing carries on from there.  An 'array' result
+    keeps the list as its `diagnostics`.
+    """
+    keep = _keep_types(include, exclude)
+    if stats is not None:
+        return _tokenize_profiled(s, lexer, engine, result, encoding, stats,
+                                  keep, diagnostics)
+
+    lexer = _lookup_lexer(lexer, {'pos': 0}, s)
+    index = LineIndex(s)
+    ctx = {'pos': 0, 'lines': index, 'diagnostics': diagnostics}
+    if jobs > 1:
+        columns = _lex_parallel(s, lexer, engine, ctx, jobs, keep)
+        return _columns_result(s, lexer, index, columns, result, encoding,
+                               diagnostics)
+    if engine == 'numpy':
+        columns = _tokenize_numpy(s, lexer, index, ctx, keep)
+        if columns is not None:
+            return _columns_result(s, lexer, index, columns, result,
+                                   encoding, diagnostics)
+    spans = _lex(s, lexer, engine, ctx)
+    if keep is not None:
+        spans = _filter_types(spans, keep)
+    return _result(s, lexer, index, _locate(spans, index), result, encoding,
+                   diagnostics)
+
+def _keep_types(include, exclude):
+    """Return the set of types to keep, or None to keep them all."""
+    if include is None and exclude is None:
+        return None
+    keep = set(TYPE_NAMES if include is None else include)
+    keep.difference_update(exclude or ())
+    return frozenset(keep)
+
+def _filter_types(spans, keep):
+    return (span for span in spans if span[0] in keep)
+
+def _result(s, lexer, index, spans, result, encoding, diagnostics=None):
+    """Build the `result` of `tokenize` from located spans."""
+    if isinstance(s, str):
+        encoding = None
+
+    if result == 'dict':
+        names = TYPE_NAMES
+        if encoding is not None:
+            return [{'type': type,
+                     'name': names[type],
+                     'value': _value(s, start, end, encoding),
+                     'line': line,
+                     'column': column}
+                    for type, start, end, line, column in spans]
+        return [{'type': type,
+                 'name': names[type],
+                 'value': s[start:end],
+                 'line': line,
+                 'column': column}
+                for type, start, end, line, column in spans]
+    if result == 'array':
+        tokens = TokenArray(s, index, lexer, encoding)
+        tokens.extend(spans)
+        if diagnostics is not None:
+            tokens.diagnostics = diagnostics
+        return tokens
+    raise ValueError("Unknown result '" + str(result) + "'")
+
+
+def _columns_result(s, lexer, index, columns, result, encoding,
+                    diagnostics=None):
+    """Build the `result` of `tokenize` from the (types, starts, ends,
+    lines, columns) arrays of located tokens."""
+    if result == 'array':
+        tokens = _result(s, lexer, index, (), result, encoding, diagnostics)
+        (tokens.types, tokens.starts, tokens.ends, tokens.lines,
+         tokens.columns) = columns
+        return tokens
+    return _result(s, lexer, index, zip(*columns), result, encoding,
+                   diagnostics)
+
+
+_ENGINES = ('python', 'regex', 'numpy')
+
+def _lex(s, lexer, engine, ctx, start=0, end=None, stats=None):
+    """Return an iterator of (type, start, end) spans of s[start:end].
+
+    With `stats`, the sub-lexers the python engine calls are timed and
+    counted in it."""
+    if end is None:
+        end = len(s)
+    if engine not in _ENGINES:
+        raise ValueError("Unknown engine '" + str(engine) + "'")
+
+    if engine == 'numpy':
+        return _lex_numpy(s, lexer, ctx, start, end, stats)
+
+    if not isinstance(s, str):
+        # bytes-like inputs are lexed as latin-1, one character per byte.
+        if engine == 'regex':
+            compiled = lexer.compile_binary()
+            if compiled is not None:
+                return _profiled_regex(_lex_regex(s, compiled, ctx, start, end),
+                                       lexer, stats)
+        return _lex_python(str(s, 'latin-1'), lexer, ctx, start, end, stats)
+
+    if engine == 'regex':
+        compiled = lexer.compile()
+        if compiled is not None:
+            return _profiled_regex(_lex_regex(s, compiled, ctx, start, end),
+                                   lexer, stats)
+
+    return _lex_python(s, lexer, ctx, start, end, stats)
+
+
+def _lex_python(s, lexer, ctx, idx, end, stats=None):
+    if stats is None:
+        table, default, identifier = lexer.dispatch()
+    else:
+        table, default, identifier = _profiled_dispatch(lexer, stats)
+    get = table.get
+    NUMBER = TYPE.NUMBER
+    IDENTIFIER = TYPE.IDENTIFIER
+    diagnostics = ctx.get('diagnostics')
+
+    # idenfier index / end
+    id_idx = idx
+    id_end = -1
+
+    while idx < end:
+        start = idx
+        ctx['pos'] = idx
+
+        # only the sub-lexers that can start with this character are tried.
+        try:
+            for type, lex in get(s[idx], default):
+                if type == NUMBER and id_end > 0:
+                    continue
+                idx = idx + lex(s, idx, end, ctx)
+                if idx != start:
+                    break
+        except LexError as e:
+            if diagnostics is None:
+                raise
+            diagnostics.append(e)
+            type = TYPE.ERROR
+            idx = _error_end(s, start, end)
+
+        # identifier.
+        if idx == start:
+            if identifier is not None:
+                idx = identifier.match(s, idx + 1, end).end()
+            else:
+                idx = idx + 1
+            id_end = idx
+            continue
+
+        if id_end > 0:
+            yield (IDENTIFIER, id_idx, id_end)
+        yield (type, start, idx)
+        id_idx = idx
+        id_end = -1
+
+    if id_end > 0:
+        yield (IDENTIFIER, id_idx, id_end)
+
+
+def _lex_regex(s, compiled, ctx, start, end):
+    regex, kinds, errors = compiled
+    diagnostics = ctx.get('diagnostics')
+    while start < end:
+        for m in regex.finditer(s, start, end):
+            span = (kinds[m.lastindex],) + m.span()
+            if span[0] < 0:
+                ctx['pos'] = span[1]
+                error = LexError(errors[-1 - span[0]], ctx, s)
+                if diagnostics is None:
+                    raise error
+                diagnostics.append(error)
+                # carry on with a new search after the error token.
+                start = _error_end(s, span[1], end)
+                yield (TYPE.ERROR, span[1], start)
+                break
+            yield span
+        else:
+            return
+
+# when recovering, an unterminated construct reaches to the end of its line.
+_REST_OF_LINE = r'(?:[^\r\n]|\r(?!\n))*'
+_rest_of_line = re.compile(_REST_OF_LINE)
+_rest_of_line_binary = re.compile(_REST_OF_LINE.encode('ascii'))
+
+def _error_end(s, idx, end):
+    """Return the end of the ERROR token for an unterminated construct at
+    `idx`, which covers at least its first character."""
+    regex = _rest_of_line if isinstance(s, str) else _rest_of_line_binary
+    return regex.match(s, idx + 1, end).end()
+
+
+# character classes of the numpy engine.  A character either is a whole
+# token of the given type by itself, continues an identifier, can only
+# start a number, or needs the sub-lexers to be called.
+_CLASS_NUMBER = 8
+_CLASS_OTHER = 9
+
+def _numpy_classes(lexer):
+    """Return a table of the class of each byte, or None if the numpy
+    engine can't be used with `lexer`."""
+    import numpy
+    table, default, identifier = lexer.dispatch()
+    if default:
+        # some sub-lexer can start anywhere.
+        return None
+    classes = numpy.full(256, TYPE.IDENTIFIER, numpy.uint8)
+    for code in range(256):
+        c = chr(code)
+        pairs = table.get(c)
+        if not pairs:
+            continue
+        if all(type == TYPE.NUMBER for type, lex in pairs):
+            classes[code] = _CLASS_NUMBER
+        elif pairs[0] == (TYPE.SPECIAL, _lex_special):
+            classes[code] = TYPE.SPECIAL
+        elif pairs[0] == (TYPE.WHITESPACE, LexWhitespace.lex) and c in ' \t':
+            classes[code] = TYPE.WHITESPACE
+        elif pairs[0] == (TYPE.NEWLINE, LexNewline.lex) and c == '\n':
+            classes[code] = TYPE.NEWLINE
+        else:
+            classes[code] = _CLASS_OTHER
+    return classes
+
+def _numpy_dispatch(lexer):
+    """Return the dispatch table of `lexer` for the numpy engine, in which
+    the sub-lexers that have a `pattern` and can't fail are matched with it
+    rather than called, as by the regex engine."""
+    matchers = {}
+    for type, sublexer in _sublexers(lexer):
+        pattern = getattr(sublexer, 'pattern', None)
+        if pattern is None or isinstance(sublexer, str) or \
+                getattr(sublexer, 'error_patterns', None):
+            continue
+        matchers[sublexer.lex] = _pattern_lex(re.compile(pattern))
+    return {c: tuple((type, matchers.get(lex, lex)) for type, lex in pairs)
+            for c, pairs in lexer.dispatch()[0].items()}
+
+def _pattern_lex(regex):
+    match = regex.match
+    def lex(s, idx, end, ctx):
+        m = match(s, idx, end)
+        return m.end() - idx if m else 0
+    return lex
+
+def _lex_numpy(s, lexer, ctx, start, end, stats=None):
+    """Lex s[start:end] by classifying every character at once with numpy.
+
+    Whitespace, newlines, special characters and identifier runs are found
+    with array operations.  The sub-lexers are only called, in order, at
+    the characters that might start a comment, string or number, and
+    whatever they match hides the characters it covers; sub-lexers that
+    have a `pattern` and can't fail are matched with it.  Inputs that
+    aren't latin-1, and lexers with sub-lexers that don't declare
+    `first_chars`, use the python engine.
+    """
+    spans = _numpy_spans(s, lexer, ctx, start, end, stats)
+    if spans is None:
+        if not isinstance(s, str):
+            s = str(s, 'latin-1')
+        return _lex_python(s, lexer, ctx, start, end, stats)
+    types, starts, ends = spans
+    return zip(types.tolist(), starts.tolist(), ends.tolist())
+
+def _numpy_spans(s, lexer, ctx, start, end, stats=None):
+    """Return the types, starts and ends of the tokens of s[start:end] as
+    numpy arrays, or None if the numpy engine can't lex it (see
+    `_lex_numpy`)."""
+    import numpy
+    classes = lexer._cached('numpy', _numpy_classes)
+    if classes is None:
+        return None
+    if isinstance(s, str):
+        try:
+            data = s[start:end].encode('latin-1')
+        except UnicodeEncodeError:
+            return None
+        text = s
+    else:
+        data = memoryview(s)[start:end]
+        text = None
+
+    kinds = classes[numpy.frombuffer(data, numpy.uint8)]
+    n = len(kinds)
+    previous = numpy.empty(n, numpy.uint8)
+    previous[:1] = TYPE.NEWLINE
+    previous[1:] = kinds[:-1]
+
+    # a number can't start in the middle of an identifier.
+    candidates = numpy.flatnonzero(
+        (kinds == _CLASS_OTHER) |
+        ((kinds == _CLASS_NUMBER) & (previous != TYPE.IDENTIFIER))).tolist()
+
+    types = []
+    starts = []
+    ends = []
+    if candidates:
+        if text is None:
+            text = str(s, 'latin-1')
+        if stats is None:
+            get = lexer._cached('numpy_dispatch', _numpy_dispatch).get
+        else:
+            get = _profiled_dispatch(lexer, stats)[0].get
+        kind = kinds.tobytes()
+        NUMBER = TYPE.NUMBER
+        IDENTIFIER = TYPE.IDENTIFIER
+        diagnostics = ctx.get('diagnostics')
+        covered = 0
+        # a number can start right after a token, whatever precedes it.
+        after_token = None
+        i = 0
+        while True:
+            if after_token is not None:
+                idx = after_token
+                after_token = None
+            elif i < len(candidates):
+                idx = candidates[i]
+                i = i + 1
+            else:
+                break
+            # an identifier is pending unless a token ended right here.
+            pending = idx > 0 and idx != covered and \
+                kind[idx - 1] >= IDENTIFIER
+            if pending and kind[idx] == _CLASS_NUMBER:
+                continue
+            pos = start + idx
+            ctx['pos'] = pos
+            for type, lex in get(text[pos]):
+                if type == NUMBER and pending:
+                    continue
+                try:
+                    length = lex(text, pos, end, ctx)
+                except LexError as e:
+                    if diagnostics is None:
+                        raise
+                    diagnostics.append(e)
+                    type = TYPE.ERROR
+                    length = _error_end(text, pos, end) - pos
+                if length:
+                    types.append(type)
+                    starts.append(idx)
+                    ends.append(idx + length)
+                    covered = idx + length
+                    if i < len(candidates) and candidates[i] < covered:
+                        i = bisect_left(candidates, covered, i)
+                    if covered < n and kind[covered] == _CLASS_NUMBER and \
+                            (i == len(candidates) or candidates[i] != covered):
+                        after_token = covered
+                    break
+
+    # characters that matched nothing continue an identifier.
+    kinds[kinds >= TYPE.IDENTIFIER] = TYPE.IDENTIFIER
+    if starts:
+        # the tokens don't overlap, so neither `starts` nor `ends` repeats.
+        depth = numpy.zeros(n + 1, numpy.int8)
+        depth[starts] = 1
+        depth[ends] -= 1
+        kinds[numpy.cumsum(depth[:-1], dtype=numpy.int8) > 0] = _CLASS_OTHER
+
+    identifier = kinds == TYPE.IDENTIFIER
+    edges = numpy.diff(identifier.astype(numpy.int8), prepend=0, append=0)
+    id_starts = numpy.flatnonzero(edges == 1)
+    singles = numpy.flatnonzero(~identifier & (kinds != _CLASS_OTHER))
+
+    all_starts = numpy.concatenate(
+        (singles, id_starts, numpy.array(starts, numpy.intp)))
+    all_ends = numpy.concatenate(
+        (singles + 1, numpy.flatnonzero(edges == -1),
+         numpy.array(ends, numpy.intp)))
+    all_types = numpy.concatenate(
+        (kinds[singles], numpy.full(len(id_starts), TYPE.IDENTIFIER, numpy.uint8),
+         numpy.array(types, numpy.uint8)))
+    order = numpy.argsort(all_starts, kind='stable')
+    return all_types[order], all_starts[order] + start, all_ends[order] + start
+
+def _tokenize_numpy(s, lexer, index, ctx, keep):
+    """Lex all of `s` with the numpy engine and return the columns of the
+    located tokens whose types are in `keep` (all if it is None) as arrays,
+    without a Python object per token, or None if the engine can't lex
+    it."""
+    import numpy
+    spans = _numpy_spans(s, lexer, ctx, 0, len(s))
+    if spans is None:
+        return None
+    types, starts, ends = spans
+    if keep is not None:
+        kept = numpy.isin(types, list(keep))
+        types, starts, ends = types[kept], starts[kept], ends[kept]
+    line_starts = numpy.asarray(index.starts, numpy.intp)
+    lines = numpy.searchsorted(line_starts, starts, 'right')
+    columns = starts - line_starts[lines - 1] + 1
+    return (array('B', types.astype(numpy.uint8).tobytes()),
+            _uint_array(starts), _uint_array(ends), _uint_array(lines),
+            _uint_array(columns))
+
+def _uint_array(values):
+    result = array('I')
+    result.frombytes(values.astype('u%d' % result.itemsize).tobytes())
+    return result
+
+
+# inputs are never split into segments shorter than this.
+_MIN_SEGMENT = 1 << 16
+
+def _segments(index, length, count, size=None):
+    """Split an input of `length` characters, whose lines are given by
+    `index`, into about `count` runs of whole lines, returned as
+    (start, end) pairs."""
+    if size is None:
+        size = max(_MIN_SEGMENT, length // count + 1)
+    starts = index.starts
+    bounds = []
+    start = 0
+    while start < length:
+        i = bisect_left(starts, start + size)
+        end = starts[i] if i < len(starts) else length
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+def _slice(s, start, end):
+    """Return s[start:end] as a str or bytes, which can be pickled."""
+    if isinstance(s, (str, bytes)):
+        return s[start:end]
+    return bytes(s[start:end])
+
+def _lex_segment(args):
+    """Lex the segment of lines `s`, which starts at `offset` and on line
+    `line` of the whole input, keeping the types in `keep` (all of them if
+    None).  Returns the columns of the located tokens, or None if the
+    segment doesn't lex on its own."""
+    s, lexer, engine, offset, line, keep = args
+    types = array('B')
+    starts = array('I')
+    ends = array('I')
+    lines = array('I')
+    columns = array('I')
+    line = line - 1
+    try:
+        # the numpy engine lexes as soon as it is called.
+        spans = _lex(s, lexer, engine, {'pos': 0})
+        if keep is not None:
+            spans = _filter_types(spans, keep)
+        for type, start, end, token_line, column in _locate(spans,
+                                                            LineIndex(s)):
+            types.append(type)
+            starts.append(start + offset)
+            ends.append(end + offset)
+            lines.append(token_line + line)
+            columns.append(column)
+    except LexError:
+        return None
+    return types, starts, ends, lines, columns
+
+def _lex_parallel(s, lexer, engine, ctx, jobs, keep=None, size=None):
+    """Lex `s` in segments of whole lines on `jobs` worker processes.
+
+    Returns the (types, starts, ends, lines, columns) arrays of the located
+    tokens whose types are in `keep`, or of all of them if it is None.
+    Workers locate their tokens within the whole input, so joining their
+    results is only a copy of each array.
+
+    Each segment is lexed speculatively, as if no block comment or string
+    were open where it starts.  When that's wrong, the previous segment
+    ends inside the open construct and so failed to lex on its own; it is
+    then lexed again together with the segment after it, all such pairs at
+    once, until every segment succeeds or the one that fails is the last.
+    """
+    index = ctx['lines']
+    runs = [[start, end, None]
+            for start, end in _segments(index, len(s), jobs * 4, size)]
+    if len(runs) < 2:
+        # too short to split; lex it here.
+        return _join_segments(s, lexer, engine, ctx, keep, runs)
+
+    import multiprocessing
+    with multiprocessing.Pool(jobs) as pool:
+        pending = runs
+        while pending:
+            results = pool.map(_lex_segment,
+                               [(_slice(s, start, end), lexer, engine, start,
+                                 index.line(start), keep)
+                                for start, end, _ in pending])
+            for run, result in zip(pending, results):
+                run[2] = result
+            merged = []
+            pending = []
+            i = 0
+            while i < len(runs):
+                run = runs[i]
+                i = i + 1
+                if run[2] is None and i < len(runs):
+                    run = [run[0], runs[i][1], None]
+                    pending.append(run)
+                    i = i + 1
+                merged.append(run)
+            runs = merged
+    return _join_segments(s, lexer, engine, ctx, keep, runs)
+
+def _join_segments(s, lexer, engine, ctx, keep, runs):
+    """Concatenate the columns of (start, end, columns) runs.  Only the
+    last run can have failed, and it is lexed here."""
+    tokens = TokenArray(s)
+    columns = (tokens.types, tokens.starts, tokens.ends, tokens.lines,
+               tokens.columns)
+    for start, end, result in runs:
+        if result is not None:
+            for column, part in zip(columns, result):
+                column.extend(part)
+            continue
+        # nothing closes the construct open at `start`, so lex the rest of
+        # the input sequentially, raising the same error (or recovering).
+        ctx['pos'] = start
+        spans = _lex(s, lexer, engine, ctx, start)
+        if keep is not None:
+            spans = _filter_types(spans, keep)
+        tokens.extend(_locate(spans, ctx['lines']))
+    return columns
+
+
+def retokenize(tokens,
+               offset,
+               removed_len,
+               inserted_text,
+               engine='python',
+               recover=None):
+    """Return a new `TokenArray` for `tokens.source` after replacing
+    `removed_len` characters at `offset` with `inserted_text`.
+
+    Lexing restarts after the last newline token before the edit and stops
+    as soon as a newline token past the edit ends where an old newline
+    token ended, since the lexer is in the same state there and the rest of
+    the input is unchanged.  The old tokens after that point are reused,
+    moved by the change in length.  Only the edited region is lexed;
+    splicing the arrays is a linear copy done in C.  For a bytes-like
+    source, `inserted_text` must be bytes.
+
+    With `recover`, which defaults to whether `tokens` were lexed with
+    `diagnostics`, unterminated comments and strings become error tokens as
+    in `tokenize`.  The diagnostics outside the relexed region are kept,
+    moved along with their tokens.
+    """
+    old = tokens
+    lexer = old.lexer
+    index = old.index
+    if index is None:
+        index = LineIndex(old.source)
+    types = old.types
+    ends = old.ends
+    NEWLINE = TYPE.NEWLINE
+
+    source = old.source
+    s = _slice(source, 0, offset) + inserted_text + \
+        _slice(source, offset + removed_len, len(source))
+    delta = len(inserted_text) - removed_len
+    edit_end = offset + len(inserted_text)
+    new_index = index.edit(offset, removed_len, inserted_text)
+
+    if recover is None:
+        recover = old.diagnostics is not None
+
+    # restart after the last newline token that ends before the edit.
+    head = bisect_right(ends, offset)
+    if recover:
+        # an error token searched the rest of the input for its end, which
+        # the edit might have added.
+        try:
+            head = min(head, types.index(TYPE.ERROR))
+        except ValueError:
+            pass
+    while head > 0 and types[head - 1] != NEWLINE:
+        head = head - 1
+    restart = ends[head - 1] if head > 0 else 0
+
+    spans = []
+    tail = len(old)
+    ctx = {'pos': restart, 'lines': new_index,
+           'diagnostics': [] if recover else None}
+    for span in _lex(s, lexer, engine, ctx, restart):
+        spans.append(span)
+        if span[0] == NEWLINE and span[2] >= edit_end:
+            j = bisect_left(ends, span[2] - delta)
+            if j < len(old) and ends[j] == span[2] - delta and \
+                    types[j] == NEWLINE:
+                tail = j + 1
+                break
+
+    new = TokenArray(s, new_index, lexer, old.encoding)
+    new.types = types[:head]
+    new.starts = old.starts[:head]
+    new.ends = ends[:head]
+    new.lines = old.lines[:head]
+    new.columns = old.columns[:head]
+    new.extend(_locate(spans, new_index))
+    if tail < len(old):
+        line_delta = new_index.line(old.starts[tail] + delta) - old.lines[tail]
+        new.types.extend(types[tail:])
+        new.starts.extend(map(delta.__add__, old.starts[tail:]))
+        new.ends.extend(map(delta.__add__, ends[tail:]))
+        new.lines.extend(map(line_delta.__add__, old.lines[tail:]))
+        new.columns.extend(old.columns[tail:])
+    if recover:
+        moved = old.starts[tail] if tail < len(old) else len(source) + 1
+        diagnostics = old.diagnostics or ()
+        new.diagnostics = \
+            [_moved_error(e, 0, new_index, s)
+             for e in diagnostics if point(e.ctx, e.s) < restart] + \
+            ctx['diagnostics'] + \
+            [_moved_error(e, delta, new_index, s)
+             for e in diagnostics if point(e.ctx, e.s) >= moved]
+    return new
+
+def _moved_error(e, delta, index, s):
+    """Return a copy of the LexError `e` for the edited input `s`, `delta`
+    characters further on."""
+    ctx = dict(e.ctx, pos=point(e.ctx, e.s) + delta, lines=index)
+    return LexError(e.msg, ctx, s)
+
+
+def tokenize_lines(s,
+                   strip_newlines=True,
+                   lexer='cpp',
+                   engine='python',
+                   result='dict',
+                   stats=None,
+                   include=None,
+                   exclude=None,
+                   view=False,
+                   diagnostics=None):
+    """Tokenize `s` and group the tokens into a list per line.
+
+    `include`, `exclude` and `diagnostics` work as in `tokenize`; lines whose
+    tokens are all filtered out are kept as empty lists.  With `view`, a
+    `TokenLines` over the flat `result` is returned instead of copying the
+    tokens into lists.
+    """
+    keep = _keep_types(include, exclude)
+    if keep is not None:
+        # newlines are needed to find the lines.
+        if TYPE.NEWLINE not in keep:
+            strip_newlines = True
+        include = keep | {TYPE.NEWLINE}
+        exclude = None
+    tokens = tokenize(s, lexer, engine, result, stats=stats,
+                      include=include, exclude=exclude,
+                      diagnostics=diagnostics)
+    if view:
+        return _line_views(tokens, strip_newlines)
+    return _group_lines(tokens, strip_newlines)
+
+def _line_views(tokens, strip_newlines):
+    if isinstance(tokens, TokenArray):
+        types = tokens.types.tobytes()
+    else:
+        types = bytes([token['type'] for token in tokens])
+    # find the newline tokens with bytes.find rather than a loop.
+    find = types.find
+    newline = bytes([TYPE.NEWLINE])
+    starts = array('I')
+    ends = array('I')
+    start = 0
+    i = find(newline)
+    while i >= 0:
+        starts.append(start)
+        ends.append(i if strip_newlines else i + 1)
+        start = i + 1
+        i = find(newline, start)
+    if start < len(types):
+        starts.append(start)
+        ends.append(len(types))
+    return TokenLines(tokens, starts, ends)
+
+
+def _group_lines(tokens, strip_newlines):
+    lines = []
+    line_tokens = []
+    for token in tokens:
+        if token['type'] == TYPE.NEWLINE:
+            if not strip_newlines:
+                line_tokens.append(token)
+            lines.append(line_tokens)
+            line_tokens = []
+        else:
+            line_tokens.append(token)
+
+    if len(line_tokens) > 0:
+        lines.append(line_tokens)
+        line_tokens = []
+
+    return lines
+
+
+def iter_tokens(source,
+                lexer='cpp',
+                engine='python',
+                chunk_size=1 << 16):
+    """Lex a text file object or an iterable of string chunks, yielding the
+    same token dicts as `tokenize` as they are recognized.
+
+    The input is lexed a run of complete lines at a time, so memory stays
+    proportional to `chunk_size` rather than to the input.  A line longer
+    than `chunk_size` is split before its last whitespace.  A token that
+    straddles a chunk boundary (a block comment, a string, ...) is lexed
+    once enough input has arrived to complete it.
+    """
+    _lookup_lexer(lexer, {'pos': 0}, '')
+
+    if isinstance(source, str):
+        chunks = [source]
+    elif hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunk_size), '')
+    else:
+        chunks = source
+
+    buf = ''
+    # lines before the start of `buf`.
+    newlines = 0
+    # characters before the start of `buf` on its first line.
+    columns = 0
+    # after a failed attempt (something is still open at the end of the
+    # buffer), wait until the buffer has doubled before trying again.
+    retry_len = 0
+
+    for chunk in chunks:
+        buf = buf + chunk
+        if len(buf) < retry_len:
+            continue
+
+        # lines never end inside a token unless that token is still open,
+        # in which case the lexer raises and we wait for more input.
+        cut = buf.rfind('\n') + 1
+        if cut == 0 and len(buf) < chunk_size:
+            continue
+        try:
+            tokens = tokenize(buf[:cut] if cut else buf, lexer, engine)
+        except LexError:
+            retry_len = 2 * len(buf)
+            continue
+
+        if cut:
+            lines = buf.count('\n', 0, cut)
+        else:
+            # a long line: keep everything from its last whitespace on,
+            # since the tokens at the end of the buffer may still grow.  As
+            # the buffer is one line, a token starts at its column - 1.
+            tokens = _before_last_whitespace(tokens)
+            if not tokens:
+                retry_len = 2 * len(buf)
+                continue
+            cut = tokens.pop()['column'] - 1
+            lines = 0
+        retry_len = 0
+        buf = buf[cut:]
+
+        for token in tokens:
+            if token['line'] == 1:
+                token['column'] = token['column'] + columns
+            token['line'] = token['line'] + newlines
+            yield token
+        if lines:
+            newlines = newlines + lines
+            columns = 0
+        else:
+            columns = columns + cut
+
+    if buf:
+        try:
+            tokens = tokenize(buf, lexer, engine)
+        except LexError as e:
+            e.line_offset = newlines
+            e.column_offset = columns
+            raise
+        for token in tokens:
+            if token['line'] == 1:
+                token['column'] = token['column'] + columns
+            token['line'] = token['line'] + newlines
+            yield token
+
+def _before_last_whitespace(tokens):
+    """Return `tokens` up to and including the last whitespace token that
+    isn't the first, or an empty list if there is none."""
+    for i in range(len(tokens) - 1, 0, -1):
+        if tokens[i]['type'] == TYPE.WHITESPACE:
+            return tokens[:i + 1]
+    return []
+
+
+def _file_lexer(path, lexer):
+    if lexer is not None:
+        return lexer
+    return os.path.splitext(path)[1][1:]
+
+def _read_file(path, encoding):
+    """Return the text of the file at `path` and its (mtime_ns, size)."""
+    with open(path, encoding=encoding, newline='') as f:
+        st = os.fstat(f.fileno())
+        return f.read(), (st.st_mtime_ns, st.st_size)
+
+def _tokenize_file(args):
+    path, lexer, engine, encoding, include, exclude, recover = args
+    try:
+        s, stamp = _read_file(path, encoding)
+        return path, tokenize(s, _file_lexer(path, lexer), engine, 'array',
+                              include=include, exclude=exclude,
+                              diagnostics=[] if recover else None), None
+    except (LexError, OSError, UnicodeDecodeError) as e:
+        return path, None, e
+
+def _lex_file(args):
+    """`_tokenize_file` for a worker process, returning (path, stamp,
+    columns, error).
+
+    Rather than a TokenArray, whose source the parent can read again faster
+    than it can unpickle it, return its columns and the offset and message
+    of each diagnostic, along with the (mtime_ns, size) `stamp` of the file
+    that was read.  A LexError is sent back as its offset and message too.
+    """
+    path, lexer, engine, encoding, include, exclude, recover = args
+    try:
+        s, stamp = _read_file(path, encoding)
+    except (OSError, UnicodeDecodeError) as e:
+        return path, None, None, e
+    try:
+        tokens = tokenize(s, _file_lexer(path, lexer), engine, 'array',
+                          include=include, exclude=exclude,
+                          diagnostics=[] if recover else None)
+    except LexError as e:
+        return path, stamp, None, (point(e.ctx, e.s), e.msg)
+    diagnostics = tokens.diagnostics
+    if diagnostics is not None:
+        diagnostics = [(point(e.ctx, e.s), e.msg) for e in diagnostics]
+    return path, stamp, (tokens.types, tokens.starts, tokens.ends,
+                         tokens.lines, tokens.columns, diagnostics), None
+
+def _load_file(result, lexer, encoding):
+    """Rebuild the TokenArray, or the LexError, of a `_lex_file` result
+    around the file's text, unless the file changed since it was lexed."""
+    path, stamp, columns, error = result
+    if stamp is None:
+        return path, None, error
+    try:
+        s, current = _read_file(path, encoding)
+    except (OSError, UnicodeDecodeError) as e:
+        return path, None, e
+    if current != stamp:
+        return path, None, OSError('File changed while it was tokenized')
+    if columns is None:
+        pos, msg = error
+        return path, None, LexError(msg, {'pos': pos}, s)
+    tokens = TokenArray(s, None, _lookup_lexer(_file_lexer(path, lexer),
+                                               {'pos': 0}, s))
+    (tokens.types, tokens.starts, tokens.ends, tokens.lines, tokens.columns,
+     diagnostics) = columns
+    if diagnostics is not None:
+        tokens.diagnostics = [LexError(msg, {'pos': pos}, s)
+                              for pos, msg in diagnostics]
+    return path, tokens, None
+
+def _walk_files(paths, accept):
+    """Yield the files in `paths`, searching directories for the files
+    whose extension (such as '.c', or '' if there is none) `accept` returns
+    true for.  Hidden files and directories, such as .git, are skipped."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield os.path.normpath(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(files):
+                if not name.startswith('.') and \
+                        accept(os.path.splitext(name)[1].lower()):
+                    yield os.path.normpath(os.path.join(root, name))
+
+def _source_files(paths, lexer=None):
+    """Yield the files in `paths`, searching directories for files with an
+    extension that has a registered lexer, or for every file if `lexer` is
+    given."""
+    if lexer is not None:
+        accept = lambda ext: True
+    else:
+        # the basic lexer is registered for '', but most files without an
+        # extension aren't text.
+        accept = lambda ext: ext != '' and ext[1:] in LEXERS
+    return _walk_files(paths, accept)
+
+def tokenize_files(paths,
+                   jobs=None,
+                   lexer=None,
+                   engine='python',
+                   encoding=None,
+                   ordered=True,
+                   chunksize=8,
+                   include=None,
+                   exclude=None,
+                   recover=False):
+    """Tokenize many files, spread over `jobs` worker processes.
+
+    Yields a (path, tokens, error) tuple per file as results come back,
+    in the order of `paths` unless `ordered` is False.  `tokens` is a
+    `TokenArray` over the file's decoded text, so its offsets and columns
+    count characters, not bytes.  Workers send back only its arrays, and
+    the file is read again in this process for the `source`; its `index`
+    is left None.  A file that can't be read or lexed, or that changed
+    before it could be read again, is reported through `error` (a
+    LexError, OSError or UnicodeDecodeError) and doesn't stop the rest of
+    the batch.
+
+    Unless `lexer` is given, each file's lexer is looked up in LEXERS by
+    its extension.  `jobs` defaults to the number of CPUs; with 1 job the
+    files are tokenized in this process.  Workers only know about lexers
+    registered at import time or inherited by forking.  `include` and
+    `exclude` filter the tokens as in `tokenize`.  With `recover`,
+    unterminated comments and strings don't fail a file; they become ERROR
+    tokens and are reported in `tokens.diagnostics`.
+    """
+    work = ((path, lexer, engine, encoding, include, exclude, recover)
+            for path in paths)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        for args in work:
+            yield _tokenize_file(args)
+        return
+
+    import multiprocessing
+    with multiprocessing.Pool(jobs) as pool:
+        if ordered:
+            results = pool.imap(_lex_file, work, chunksize)
+        else:
+            results = pool.imap_unordered(_lex_file, work, chunksize)
+        for result in results:
+            yield _load_file(result, lexer, encoding)
+
+def tokenize_path(path,
+                  lexer=None,
+                  engine='regex',
+                  result='array',
+                  encoding='utf-8'):
+    """Tokenize the file at `path` without reading it into memory.
+
+    The file is memory-mapped and lexed as bytes (see `tokenize`), so
+    offsets and columns count bytes and only token values are decoded,
+    with `encoding`.  The returned tokens keep the mapping alive.  Unless
+    `lexer` is given, it is looked up in LEXERS by the file's extension.
+    """
+    import mmap
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # an empty file can't be mapped.
+            s = b''
+        else:
+            s = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return tokenize(s, _file_lexer(path, lexer), engine, result,
+                    encoding=encoding)
+
+#******************************************************************************
+# profiling
+#******************************************************************************
+
+#==============================================================================
+# LexStats
+#==============================================================================
+class LexStats:
+    """Counts and timings collected by `tokenize(..., stats=...)`.
+
+    `calls`, `matches`, `chars` and `seconds` map the name of each
+    sub-lexer (its class name, 'special' or 'identifier') to how often it
+    was tried, how often it matched, how many characters it consumed and
+    the time spent in it.  `tokens` maps type names to token counts and
+    `total_seconds` is the time spent in `tokenize`.  The regex engine tries
+    every sub-lexer at once, so there each token counts as one call to the
+    sub-lexer that matched it, taking as long as the search for it.  The
+    python engine only counts identifiers when every sub-lexer declares its
+    `first_chars`.
+
+    Pass the same LexStats to several calls to add up their numbers.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.matches = {}
+        self.chars = {}
+        self.seconds = {}
+        self.tokens = {}
+        self.total_seconds = 0.0
+
+    def as_dict(self):
+        return {'calls': dict(self.calls),
+                'matches': dict(self.matches),
+                'chars': dict(self.chars),
+                'seconds': dict(self.seconds),
+                'tokens': dict(self.tokens),
+                'total_seconds': self.total_seconds}
+
+    def __str__(self):
+        lines = ['%-16s %10s %10s %12s %10s' % (
+            'sub-lexer', 'calls', 'matches', 'chars', 'seconds')]
+        for name in sorted(self.calls, key=self.seconds.get, reverse=True):
+            lines.append('%-16s %10d %10d %12d %10.4f' % (
+                name, self.calls[name], self.matches.get(name, 0),
+                self.chars.get(name, 0), self.seconds[name]))
+        lines.append('tokens: ' + ', '.join(
+            '%s=%d' % item for item in sorted(self.tokens.items())))
+        lines.append('total: %.4f seconds' % self.total_seconds)
+        return '\n'.join(lines)
+
+
+def _tokenize_profiled(s, lexer, engine, result, encoding, stats, keep,
+                       diagnostics=None):
+    import time
+    callback = None
+    if not isinstance(stats, LexStats):
+        callback = stats
+        stats = LexStats()
+
+    started = time.perf_counter()
+    lexer = _lookup_lexer(lexer, {'pos': 0}, s)
+    index = LineIndex(s)
+    ctx = {'pos': 0, 'lines': index, 'diagnostics': diagnostics}
+    spans = _count_tokens(_lex(s, lexer, engine, ctx, stats=stats), stats)
+    if keep is not None:
+        spans = _filter_types(spans, keep)
+    tokens = _result(s, lexer, index, _locate(spans, index), result, encoding,
+                     diagnostics)
+    stats.total_seconds = stats.total_seconds + time.perf_counter() - started
+
+    if callback is not None:
+        callback(stats)
+    return tokens
+
+def _count_tokens(spans, stats):
+    counts = stats.tokens
+    for span in spans:
+        name = TYPE_NAMES[span[0]]
+        counts[name] = counts.get(name, 0) + 1
+        yield span
+
+def _sublexer_names(lexer):
+    """Map each token type to the name of the sub-lexer producing it."""
+    names = {TYPE.IDENTIFIER: 'identifier', TYPE.ERROR: 'error'}
+    for type, sublexer in _sublexers(lexer):
+        if isinstance(sublexer, str):
+            names[type] = 'special'
+        elif sublexer is not LexNothing:
+            names[type] = getattr(sublexer, '__name__',
+                                  sublexer.__class__.__name__)
+    return names
+
+def _record(stats, name, calls, chars, seconds):
+    stats.calls[name] = stats.calls.get(name, 0) + calls
+    stats.seconds[name] = stats.seconds.get(name, 0.0) + seconds
+    if chars:
+        stats.matches[name] = stats.matches.get(name, 0) + 1
+        stats.chars[name] = stats.chars.get(name, 0) + chars
+
+def _profiled_lex(lex, name, stats, clock):
+    def profiled(s, idx, end, ctx):
+        started = clock()
+        n = 0
+        try:
+            n = lex(s, idx, end, ctx)
+        finally:
+            _record(stats, name, 1, n, clock() - started)
+        return n
+    return profiled
+
+class _ProfiledMatcher:
+    """Stands in for the identifier regex of a dispatch table."""
+
+    def __init__(self, regex, stats, clock):
+        self.regex = regex
+        self.stats = stats
+        self.clock = clock
+
+    def match(self, s, pos, end):
+        started = self.clock()
+        m = self.regex.match(s, pos, end)
+        # the identifier's first character was consumed before the match.
+        _record(self.stats, 'identifier', 1, m.end() - pos + 1,
+                self.clock() - started)
+        return m
+
+def _profiled_dispatch(lexer, stats):
+    """Return `lexer.dispatch()` with every sub-lexer wrapped to record its
+    calls in `stats`."""
+    import time
+    clock = time.perf_counter
+    table, default, identifier = lexer.dispatch()
+    names = _sublexer_names(lexer)
+    wrapped = {}
+    def wrap(pairs):
+        result = []
+        for type, lex in pairs:
+            if lex not in wrapped:
+                wrapped[lex] = _profiled_lex(lex, names[type], stats, clock)
+            result.append((type, wrapped[lex]))
+        return tuple(result)
+
+    table = {c: wrap(pairs) for c, pairs in table.items()}
+    default = wrap(default)
+    if identifier is not None:
+        identifier = _ProfiledMatcher(identifier, stats, clock)
+    return table, default, identifier
+
+def _profiled_regex(spans, lexer, stats):
+    if stats is None:
+        return spans
+    return _profile_spans(spans, _sublexer_names(lexer), stats)
+
+def _profile_spans(spans, names, stats):
+    import time
+    clock = time.perf_counter
+    spans = iter(spans)
+    while True:
+        started = clock()
+        span = next(spans, None)
+        if span is None:
+            return
+        type, start, end = span
+        _record(stats, names[type], 1, end - start, clock() - started)
+        yield span
+
+
+#******************************************************************************
+# cache
+#******************************************************************************
+
+#==============================================================================
+# TokenCache
+#==============================================================================
+class TokenCache:
+    """Caches tokens by a hash of the input and the lexer's fingerprint.
+
+    Recently used results are kept in memory, up to `maxsize` inputs.  When
+    `directory` is given, results are also stored there, one file per
+    input, and the least recently used files are removed once they add up
+    to more than `max_bytes`.  Only compact arrays are cached, so every
+    hit builds a fresh result that callers are free to modify.
+
+    `hits`, `disk_hits` and `misses` count lookups, see `stats`.
+    """
+
+    def __init__(self, maxsize=256, directory=None, max_bytes=1 << 30):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._disk_bytes = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def tokenize(self, s, lexer='cpp', engine='python', result='dict', jobs=1,
+                 encoding='utf-8'):
+        """Like `tokenize`, but served from the cache when possible."""
+        lexer = _lookup_lexer(lexer, {'pos': 0}, s)
+        arrays = self._lookup(s, lexer, engine, jobs)
+        if isinstance(s, str):
+            encoding = None
+        tokens = TokenArray(s, None, lexer, encoding)
+        (tokens.types, tokens.starts, tokens.ends,
+         tokens.lines, tokens.columns) = [a[:] for a in arrays]
+        if result == 'array':
+            tokens.index = LineIndex(s)
+            return tokens
+        if result == 'dict':
+            return tokens.to_dicts()
+        raise ValueError("Unknown result '" + str(result) + "'")
+
+    def tokenize_lines(self, s, strip_newlines=True, lexer='cpp',
+                       engine='python', result='dict'):
+        """Like `tokenize_lines`, but served from the cache when possible."""
+        return _group_lines(self.tokenize(s, lexer, engine, result),
+                            strip_newlines)
+
+    def stats(self):
+        """Return the hit/miss counts and current size of the cache."""
+        return {'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'disk_bytes': self._disk_bytes}
+
+    def clear(self):
+        """Drop the in-memory entries; the directory is left alone."""
+        self._entries.clear()
+
+    def _key(self, s, lexer):
+        import hashlib
+        h = hashlib.sha1(lexer.fingerprint().encode())
+        if isinstance(s, str):
+            h.update(s.encode('utf-8', 'surrogatepass'))
+        else:
+            # offsets into bytes differ from offsets into the decoded str.
+            h.update(b'\0bytes')
+            h.update(s)
+        return h.hexdigest()
+
+    def _lookup(self, s, lexer, engine, jobs):
+        key = self._key(s, lexer)
+        arrays = self._entries.get(key)
+        if arrays is not None:
+            self._entries.move_to_end(key)
+            self.hits = self.hits + 1
+            return arrays
+
+        arrays = self._load(key)
+        if arrays is not None:
+            self.disk_hits = self.disk_hits + 1
+        else:
+            self.misses = self.misses + 1
+            tokens = tokenize(s, lexer, engine, 'array', jobs)
+            arrays = (tokens.types, tokens.starts, tokens.ends,
+                      tokens.lines, tokens.columns)
+            self._store(key, arrays)
+
+        self._entries[key] = arrays
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return arrays
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.tokens')
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        import pickle
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                arrays = pickle.load(f)
+            # mark the file as recently used.
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return arrays
+
+    def _store(self, key, arrays):
+        if self.directory is None:
+            return
+        import pickle
+        path = self._path(key)
+        tmp = path + '.%d.tmp' % os.getpid()
+        with open(tmp, 'wb') as f:
+            pickle.dump(arrays, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for path, size, mtime in self._files())
+        else:
+            self._disk_bytes = self._disk_bytes + os.path.getsize(path)
+        if self._disk_bytes > self.max_bytes:
+            self._evict()
+
+    def _files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.tokens'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, st.st_size, st.st_mtime))
+        return files
+
+    def _evict(self):
+        """Remove the least recently used files until the store fits."""
+        files = self._files()
+        files.sort(key=lambda file: file[2])
+        total = sum(size for path, size, mtime in files)
+        for path, size, mtime in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total = total - size
+        self._disk_bytes = total
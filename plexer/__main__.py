@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+    Command Line
+    ~~~~~~~~~~~~
+
+    python -m plexer [options] path...
+
+    Tokenizes files, and the files with a registered lexer in directories,
+    and streams the tokens to stdout as each file is finished: one JSON
+    object per token per line, or `plexer.binary` frames named after each
+    file.  A summary of files, tokens and throughput goes to stderr, as
+    does every file that couldn't be tokenized; the exit status is 1 if
+    there were any.  With --recover, unterminated comments and strings are
+    output as error tokens and reported as warnings instead.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import plexer
+from plexer import TYPE_NAMES, binary
+
+_TYPES = {name: type for type, name in TYPE_NAMES.items()}
+
+# tokens per write, for JSON Lines.
+_BATCH = 4096
+
+def _types(names):
+    if not names:
+        return None
+    types = set()
+    for name in names:
+        for name in name.split(','):
+            if name not in _TYPES:
+                raise argparse.ArgumentTypeError(
+                    "unknown token type '%s' (choose from %s)"
+                    % (name, ', '.join(sorted(_TYPES))))
+            types.add(_TYPES[name])
+    return types
+
+def write_jsonl(out, path, tokens):
+    """Write one JSON object per token of `tokens` to the binary file
+    `out`."""
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    source = tokens.source
+    prefix = '{"path":' + encode(path) + ',"line":'
+    names = TYPE_NAMES
+    batch = []
+    for type, start, end, line, column in zip(
+            tokens.types, tokens.starts, tokens.ends,
+            tokens.lines, tokens.columns):
+        batch.append('%s%d,"column":%d,"type":%d,"name":"%s","value":%s}\n' % (
+            prefix, line, column, type, names[type], encode(source[start:end])))
+        if len(batch) == _BATCH:
+            out.write(''.join(batch).encode('utf-8', 'surrogatepass'))
+            batch = []
+    out.write(''.join(batch).encode('utf-8', 'surrogatepass'))
+
+def write_binary(out, path, tokens):
+    """Write `tokens` to the binary file `out` as a frame named `path`."""
+    binary.dump_frame(out, path, tokens)
+
+FORMATS = {
+    'jsonl': write_jsonl,
+    'binary': write_binary,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m plexer',
+        description='Tokenize files and stream the tokens to stdout.')
+    parser.add_argument('paths', nargs='+', metavar='path',
+                        help='a file, or a directory to search for files '
+                             'with a registered lexer')
+    parser.add_argument('--lexer',
+                        help='lex every file with the lexer registered for '
+                             'this extension (default: by file extension)')
+    parser.add_argument('--engine', default='python', choices=plexer._ENGINES,
+                        help='lexing engine (default: %(default)s)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='worker processes (default: number of CPUs)')
+    parser.add_argument('--format', default='jsonl', choices=list(FORMATS),
+                        help='output format (default: %(default)s)')
+    parser.add_argument('--include', action='append',
+                        help='only output tokens of these types, '
+                             'comma-separated; may be repeated')
+    parser.add_argument('--exclude', action='append',
+                        help='leave out tokens of these types, '
+                             'comma-separated; may be repeated')
+    parser.add_argument('--encoding', default='utf-8',
+                        help='encoding of the files (default: %(default)s)')
+    parser.add_argument('--recover', action='store_true',
+                        help='output unterminated comments and strings as '
+                             'error tokens rather than failing the file')
+    parser.add_argument('--unordered', action='store_true',
+                        help='output files as they are finished rather than '
+                             'in order')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help="don't print the summary")
+    args = parser.parse_args(argv)
+    try:
+        include = _types(args.include)
+        exclude = _types(args.exclude)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    write = FORMATS[args.format]
+    out = sys.stdout.buffer
+    paths = plexer._source_files(args.paths, args.lexer)
+    start = time.perf_counter()
+    files = tokens = size = errors = warnings = 0
+    results = plexer.tokenize_files(paths, args.jobs, args.lexer, args.engine,
+                                    args.encoding, not args.unordered,
+                                    include=include, exclude=exclude,
+                                    recover=args.recover)
+    try:
+        for path, result, error in results:
+            if error is not None:
+                print('%s: %s' % (path, error), file=sys.stderr)
+                errors = errors + 1
+                continue
+            for e in result.diagnostics or ():
+                print('%s:%d:%d: warning: %s' % (path, e.row, e.col, e.msg),
+                      file=sys.stderr)
+                warnings = warnings + 1
+            write(out, path, result)
+            files = files + 1
+            tokens = tokens + len(result)
+            size = size + os.path.getsize(path)
+        out.flush()
+    except BrokenPipeError:
+        # the reader went away; don't complain about it when exiting.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    finally:
+        results.close()
+
+    if not args.quiet:
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print('%d files, %d tokens, %d bytes in %.2fs '
+              '(%.0f tokens/s, %.2f MB/s), %d errors, %d warnings'
+              % (files, tokens, size, elapsed, tokens / elapsed,
+                 size / elapsed / 1e6, errors, warnings), file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
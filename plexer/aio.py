@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+    Asyncio
+    ~~~~~~~
+
+    Coroutines that tokenize on an executor, so that lexing a large input
+    doesn't block the event loop.
+
+    `executor` is any `concurrent.futures` executor, or None for the loop's
+    default thread pool.  A process pool lexes without holding the GIL of
+    the loop's process, but its arguments and results are pickled; prefer
+    `result='array'` there.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import asyncio
+import functools
+import os
+
+from plexer import _tokenize_file, iter_tokens, tokenize
+
+async def atokenize(s, lexer='cpp', engine='python', result='dict',
+                    executor=None, **kwargs):
+    """Like `tokenize`, run on `executor`.
+
+    Cancelling the returned coroutine stops waiting for the result; a call
+    that already started keeps running on its worker, but a queued one
+    never starts.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(tokenize, s, lexer, engine, result,
+                                    **kwargs))
+
+async def aiter_tokens(source, lexer='cpp', engine='python',
+                       chunk_size=1 << 16, batch_size=1024, executor=None):
+    """Yield the token dicts of `source` as they are lexed.
+
+    `source` is a string, a text file object or an iterable of string
+    chunks, as for `iter_tokens`; a string is fed to it `chunk_size`
+    characters at a time, so the first tokens arrive long before the last
+    are lexed.  Tokens are lexed `batch_size` at a time on `executor`,
+    which must be a thread pool (or None), and lexing stops as soon as the
+    iteration is cancelled or abandoned.
+    """
+    if isinstance(source, str):
+        source = _chunks(source, chunk_size)
+    tokens = iter_tokens(source, lexer, engine, chunk_size)
+    loop = asyncio.get_event_loop()
+    try:
+        while True:
+            batch = await loop.run_in_executor(
+                executor, _take, tokens, batch_size)
+            for token in batch:
+                yield token
+            if len(batch) < batch_size:
+                return
+    finally:
+        try:
+            tokens.close()
+        except ValueError:
+            # a worker is still lexing the last batch, which is dropped.
+            pass
+
+def _chunks(s, size):
+    for i in range(0, len(s), size):
+        yield s[i:i + size]
+
+def _take(tokens, count):
+    batch = []
+    for token in tokens:
+        batch.append(token)
+        if len(batch) == count:
+            break
+    return batch
+
+async def atokenize_files(paths, lexer=None, engine='python', encoding=None,
+                          executor=None, limit=None, ordered=False):
+    """Like `tokenize_files`, yielding (path, tokens, error) tuples from
+    `executor` as they complete.
+
+    At most `limit` files are in flight at once, by default as many as
+    there are CPUs.  Results arrive as they complete unless `ordered` is
+    true.  Files still in flight when the iteration is cancelled or
+    abandoned are cancelled too.
+    """
+    if limit is None:
+        limit = os.cpu_count() or 1
+    loop = asyncio.get_event_loop()
+    paths = iter(paths)
+    pending = []
+    def submit():
+        for path in paths:
+            pending.append(loop.run_in_executor(
+                executor, _tokenize_file,
+                (path, lexer, engine, encoding, None, None, False)))
+            if len(pending) >= limit:
+                return
+
+    try:
+        submit()
+        while pending:
+            if ordered:
+                result = await pending[0]
+                pending.pop(0)
+            else:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+                result = future.result()
+            submit()
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
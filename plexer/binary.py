@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+    Binary Token Format
+    ~~~~~~~~~~~~~~~~~~~
+
+    A compact file format for token streams, and a reader that uses the
+    records in place.
+
+    All integers are little-endian.  A stream is laid out as:
+
+        magic        4 bytes    b'PLXT'
+        version      u16        1
+        flags        u16        1 if a string table follows the records
+        count        u32        number of tokens
+        lexer        20 bytes   sha1 `Lexer.fingerprint`, or zeros
+        type table   u8 n, then n times (u8 type, u8 length, name)
+        encoding     u8 length, then the encoding of the string table,
+                     empty if token values are bytes
+        padding      to a multiple of 4 bytes
+        types        count u8, padded to a multiple of 4 bytes
+        offsets      count u32, offset of each token in the string table
+        lengths      count u32
+        lines        count u32
+        columns      count u32
+        strings      u64 length, then the string table (if flags & 1)
+
+    Each field of the records is stored as its own array, as in
+    `TokenArray`, so the reader can expose it as a `memoryview` without
+    copying.  When the tokens cover their whole input, the string table is
+    simply the input.
+
+    Several streams can be written one after another as frames, each
+    preceded by a name (such as the path of the file the tokens came
+    from):
+
+        name         u32 length, then the name in utf-8
+        stream       u64 length, then the stream
+
+    :license: MIT, see LICENSE for more details.
+"""
+import struct
+import sys
+from array import array
+
+from plexer import TYPE_NAMES, Token, TokenArray, _value
+
+MAGIC = b'PLXT'
+VERSION = 1
+
+HAS_STRINGS = 1
+
+_HEADER = struct.Struct('<4sHHI20s')
+_FRAME_NAME = struct.Struct('<I')
+_FRAME_DATA = struct.Struct('<Q')
+
+def dumps(tokens, strings=True):
+    """Return `tokens`, a `TokenArray` or a list of token dicts, in the
+    binary format; without `strings`, token values aren't included."""
+    if isinstance(tokens, TokenArray):
+        data, encoding, starts, lengths = _array_strings(tokens)
+        types = tokens.types
+        lines = tokens.lines
+        columns = tokens.columns
+        fingerprint = b''
+        if tokens.lexer is not None:
+            fingerprint = bytes.fromhex(tokens.lexer.fingerprint())
+    else:
+        data, encoding, starts, lengths = _dict_strings(tokens)
+        types = array('B', [token['type'] for token in tokens])
+        lines = array('I', [token['line'] for token in tokens])
+        columns = array('I', [token['column'] for token in tokens])
+        fingerprint = b''
+
+    parts = [_HEADER.pack(MAGIC, VERSION, HAS_STRINGS if strings else 0,
+                          len(types), fingerprint)]
+    table = [bytes([len(TYPE_NAMES)])]
+    for type, name in sorted(TYPE_NAMES.items()):
+        name = name.encode('utf-8')
+        table.append(bytes([type, len(name)]) + name)
+    parts.append(b''.join(table))
+    encoding = (encoding or '').encode('ascii')
+    parts.append(bytes([len(encoding)]) + encoding)
+    _pad(parts)
+
+    parts.append(types.tobytes())
+    _pad(parts)
+    for column in (starts, lengths, lines, columns):
+        if sys.byteorder == 'big':
+            column = array('I', column)
+            column.byteswap()
+        parts.append(column.tobytes())
+
+    if strings:
+        parts.append(struct.pack('<Q', len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+def dump(tokens, f, strings=True):
+    """Write `tokens` in the binary format to the binary file `f`."""
+    f.write(dumps(tokens, strings))
+
+def loads(data):
+    """Return a `TokenReader` over `data`, which may be any buffer."""
+    return TokenReader(data)
+
+def load(path):
+    """Return a `TokenReader` over the file at `path`, which is
+    memory-mapped rather than read."""
+    import mmap
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return TokenReader(data)
+
+def dump_frame(f, name, tokens, strings=True):
+    """Write `tokens` to the binary file `f` as a frame called `name`."""
+    name = name.encode('utf-8', 'surrogateescape')
+    data = dumps(tokens, strings)
+    f.write(_FRAME_NAME.pack(len(name)) + name + _FRAME_DATA.pack(len(data)))
+    f.write(data)
+
+def iter_frames(f):
+    """Yield (name, TokenReader) for each frame in the binary file `f`."""
+    while True:
+        header = f.read(_FRAME_NAME.size)
+        if not header:
+            return
+        if len(header) != _FRAME_NAME.size:
+            raise ValueError('Truncated token stream frame')
+        name = _read(f, _FRAME_NAME.unpack(header)[0])
+        size, = _FRAME_DATA.unpack(_read(f, _FRAME_DATA.size))
+        data = _read(f, size)
+        yield name.decode('utf-8', 'surrogateescape'), TokenReader(data)
+
+def _read(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError('Truncated token stream frame')
+    return data
+
+def _pad(parts):
+    size = sum(len(part) for part in parts)
+    parts.append(b'\0' * (-size % 4))
+
+def _array_strings(tokens):
+    """Return (string table, encoding, offsets, lengths) for a TokenArray,
+    using its source as the string table."""
+    source = tokens.source
+    starts = tokens.starts
+    lengths = array('I', map(int.__sub__, tokens.ends, starts))
+    if not isinstance(source, str):
+        return bytes(source), tokens.encoding, starts, lengths
+    try:
+        return source.encode('ascii'), 'utf-8', starts, lengths
+    except UnicodeEncodeError:
+        pass
+
+    # offsets count characters; the string table counts bytes.
+    data = source.encode('utf-8', 'surrogatepass')
+    byte_starts = array('I')
+    byte_lengths = array('I')
+    pos = 0
+    byte_pos = 0
+    for start, end in zip(starts, tokens.ends):
+        byte_pos = byte_pos + len(source[pos:start].encode('utf-8', 'surrogatepass'))
+        length = len(source[start:end].encode('utf-8', 'surrogatepass'))
+        byte_starts.append(byte_pos)
+        byte_lengths.append(length)
+        byte_pos = byte_pos + length
+        pos = end
+    return data, 'utf-8', byte_starts, byte_lengths
+
+def _dict_strings(tokens):
+    """Return (string table, encoding, offsets, lengths) for token dicts,
+    concatenating their values."""
+    values = [token['value'].encode('utf-8', 'surrogatepass') for token in tokens]
+    lengths = array('I', map(len, values))
+    starts = array('I')
+    pos = 0
+    for length in lengths:
+        starts.append(pos)
+        pos = pos + length
+    return b''.join(values), 'utf-8', starts, lengths
+
+#==============================================================================
+# TokenReader
+#==============================================================================
+class TokenReader:
+    """Reads tokens in the binary format without copying them.
+
+    `types`, `offsets`, `lengths`, `lines` and `columns` are memoryviews of
+    the records and `strings` of the string table (None if there isn't
+    one).  A `Token` is only built when one is looked up.
+    """
+
+    def __init__(self, data):
+        view = memoryview(data).cast('B')
+        if len(view) < _HEADER.size:
+            raise ValueError('Not a plexer token stream')
+        magic, version, flags, count, fingerprint = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('Not a plexer token stream')
+        if version != VERSION:
+            raise ValueError('Unsupported token stream version %d' % version)
+        self.data = data
+        self.fingerprint = fingerprint.hex() if any(fingerprint) else None
+
+        pos = _HEADER.size
+        self.type_names = {}
+        for _ in range(view[pos]):
+            pos = pos + 1
+            type, length = view[pos], view[pos + 1]
+            self.type_names[type] = bytes(view[pos + 2:pos + 2 + length]).decode('utf-8')
+            pos = pos + 1 + length
+        pos = pos + 1
+        length = view[pos]
+        self.encoding = bytes(view[pos + 1:pos + 1 + length]).decode('ascii') or None
+        pos = pos + 1 + length
+        pos = pos + (-pos % 4)
+
+        self.types = view[pos:pos + count]
+        pos = pos + count + (-count % 4)
+        columns = []
+        for _ in range(4):
+            column = view[pos:pos + 4 * count]
+            if sys.byteorder == 'big':
+                column = array('I', column.tobytes())
+                column.byteswap()
+                column = memoryview(column)
+            columns.append(column.cast('I'))
+            pos = pos + 4 * count
+        self.offsets, self.lengths, self.lines, self.columns = columns
+
+        self.strings = None
+        if flags & HAS_STRINGS:
+            length, = struct.unpack_from('<Q', view, pos)
+            self.strings = view[pos + 8:pos + 8 + length]
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start = self.offsets[i]
+        return Token(self.types[i], start, start + self.lengths[i],
+                     self.lines[i], self.columns[i], self.strings,
+                     self.encoding)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def value(self, i):
+        """Return the value of the `i`th token, or None without a string
+        table."""
+        start = self.offsets[i]
+        return _value(self.strings, start, start + self.lengths[i],
+                      self.encoding)
+
+    def to_dicts(self):
+        """Return the tokens as the list of dicts `tokenize` returns."""
+        names = self.type_names
+        return [{'type': type,
+                 'name': names.get(type),
+                 'value': self.value(i),
+                 'line': line,
+                 'column': column}
+                for i, (type, line, column) in enumerate(
+                    zip(self.types, self.lines, self.columns))]
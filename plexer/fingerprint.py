@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+    Token Fingerprints
+    ~~~~~~~~~~~~~~~~~~
+
+    Fingerprints of token streams for finding copied code, and an index of
+    the fingerprints of many files.
+
+    The tokens that don't affect what code does (whitespace, newlines and
+    comments) are dropped, and identifiers and literals can be replaced by
+    their type so that renamed copies match too.  Every window of `k`
+    consecutive tokens is hashed, and winnowing keeps the smallest hash of
+    each `window` consecutive ones.  Any run of at least `k + window - 1`
+    tokens shared by two files is then guaranteed to give them a
+    fingerprint in common, while only about 2 / (window + 1) of the hashes
+    are kept.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import zlib
+from array import array
+from collections import deque
+
+import plexer
+from plexer import TYPE, TYPE_NAMES, TokenArray
+from plexer.index import _FileIndex
+
+# tokens per hashed window, and hashed windows per winnowing window.
+K = 8
+WINDOW = 8
+
+# a hash repeated more often than this in a file isn't matched in it.
+MAX_REPEATS = 16
+
+_VERSION = 1
+
+_SKIP = frozenset((TYPE.NEWLINE, TYPE.WHITESPACE, TYPE.COMMENT))
+_LITERALS = (TYPE.NUMBER, TYPE.STRING)
+
+# the hash of a token replaced by its type.
+_TYPE_HASHES = {type: zlib.crc32(b'\0' + name.encode('ascii'))
+                for type, name in TYPE_NAMES.items()}
+
+# k-token windows are hashed as base-_BASE numbers modulo 2 ** 64.
+_BASE = 1099511628211
+_MASK = (1 << 64) - 1
+
+def normalize(tokens, identifiers=False, literals=False):
+    """Return the tokens of `tokens` that matter when comparing code, as
+    (key, line) pairs.
+
+    `tokens` is a `TokenArray` or a list of token dicts, as returned by
+    `tokenize`.  Whitespace, newlines and comments are dropped.  `key` is
+    the token's value, or its `TYPE` if it is an identifier and
+    `identifiers` is true, or a number or string and `literals` is true.
+    """
+    abstract = set()
+    if identifiers:
+        abstract.add(TYPE.IDENTIFIER)
+    if literals:
+        abstract.update(_LITERALS)
+    skip = _SKIP
+
+    if isinstance(tokens, TokenArray):
+        source = tokens.source
+        _slice = plexer._slice
+        return [(type if type in abstract else _slice(source, start, end),
+                 line)
+                for type, start, end, line in zip(
+                    tokens.types, tokens.starts, tokens.ends, tokens.lines)
+                if type not in skip]
+    return [(token['type'] if token['type'] in abstract else token['value'],
+             token['line'])
+            for token in tokens if token['type'] not in skip]
+
+def _hash_key(key):
+    if isinstance(key, int):
+        return _TYPE_HASHES[key]
+    if isinstance(key, str):
+        key = key.encode('utf-8', 'surrogatepass')
+    return zlib.crc32(key)
+
+def fingerprints(tokens, k=K, window=WINDOW, identifiers=False,
+                 literals=False):
+    """Return the winnowed fingerprints of `tokens`, as (hash, position,
+    first_line, last_line) tuples in order.
+
+    `position` counts the tokens `normalize` keeps before the `k` that were
+    hashed, and the lines are those the first and last of them start on.
+    An input with fewer than `k` such tokens has no fingerprints.
+    """
+    keys = normalize(tokens, identifiers, literals)
+    if len(keys) < k:
+        return []
+    hashes = [_hash_key(key) for key, line in keys]
+
+    # the rolling hash of every k tokens.
+    top = pow(_BASE, k - 1, _MASK + 1)
+    h = 0
+    for t in hashes[:k]:
+        h = (h * _BASE + t) & _MASK
+    grams = [h]
+    for i in range(k, len(hashes)):
+        h = ((h - hashes[i - k] * top) * _BASE + hashes[i]) & _MASK
+        grams.append(h)
+
+    # winnowing: keep the smallest hash of each window, the rightmost one on
+    # ties, once.  The queue holds the positions of increasing hashes that
+    # may still be the smallest of a window.
+    selected = []
+    queue = deque()
+    last = -1
+    final = len(grams) - 1
+    for i, h in enumerate(grams):
+        while queue and grams[queue[-1]] >= h:
+            queue.pop()
+        queue.append(i)
+        if queue[0] <= i - window:
+            queue.popleft()
+        if i >= window - 1 or i == final:
+            j = queue[0]
+            if j != last:
+                selected.append((grams[j], j, keys[j][1], keys[j + k - 1][1]))
+                last = j
+    return selected
+
+#==============================================================================
+# FingerprintIndex
+#==============================================================================
+class FingerprintIndex(_FileIndex):
+    """The fingerprints of many files, for finding the regions they share.
+
+    `k`, `window`, `identifiers` and `literals` are passed to
+    `fingerprints` for every file.  For each file, the index keeps its
+    fingerprints as flat arrays, and for each hash the files it occurs in.
+    The index is loaded from, and saved to, the pickle file `path` when
+    given, unless it was saved with other settings.  `update` re-tokenizes
+    new and modified files; `errors` holds the files that couldn't be
+    fingerprinted by the last update.
+    """
+
+    _version = _VERSION
+
+    def __init__(self, path=None, k=K, window=WINDOW, identifiers=False,
+                 literals=False):
+        _FileIndex.__init__(self, path)
+        self.settings = (k, window, identifiers, literals)
+        self._ids = {}
+        self._paths = []
+        # the ids of removed files, for the next files added.
+        self._free = []
+        self._postings = {}
+        self._located = {}
+        state = self._load()
+        if state is not None and state['settings'] == self.settings:
+            for path, entry in state['files'].items():
+                self._add(path, entry)
+
+    def __contains__(self, path):
+        return path in self.files
+
+    def add(self, path, tokens, mtime_ns=0, size=0):
+        """Add the fingerprints of `tokens` to the index as `path`,
+        replacing any it had."""
+        self.remove(path)
+        selected = fingerprints(tokens, *self.settings)
+        self._add(path, (mtime_ns, size) + _pack(selected))
+
+    def matches(self, fingerprints, min_fingerprints=1, exclude=None,
+                max_repeats=MAX_REPEATS):
+        """Return the regions of indexed files matching `fingerprints`, as
+        returned by the `fingerprints` function.
+
+        Each match is a dict with the `path` of the indexed file, the
+        `lines` of the region in it, the `query_lines` of the region it
+        matches and the number of `fingerprints` they share, which must be
+        at least `min_fingerprints`.  Shared fingerprints belong to the
+        same region while they are at the same distance from each other in
+        both inputs and no more than a winnowing window apart.  Matches in
+        the indexed file `exclude` are left out.
+
+        A hash found more than `max_repeats` times in one indexed file, as
+        in generated or very repetitive code, is ignored for that file, so
+        that the pairs compared stay proportional to the query.
+        """
+        window = self.settings[1]
+        exclude = self._ids.get(exclude)
+        postings = self._postings
+        located = self._located
+        regions = {}
+        for h, position, first, last in fingerprints:
+            ids = postings.get(h)
+            if ids is None:
+                continue
+            if isinstance(ids, int):
+                ids = (ids,)
+            for file_id in ids:
+                if file_id == exclude:
+                    continue
+                positions = located.get(file_id)
+                if positions is None:
+                    positions = located[file_id] = self._locate(file_id)
+                positions = positions[h]
+                if len(positions) > max_repeats:
+                    continue
+                active = regions.setdefault(file_id, {})
+                entry = self.files[self._paths[file_id]]
+                for j in positions:
+                    _extend(active, window, position, first, last, entry, j)
+
+        results = []
+        for file_id, active in regions.items():
+            path = self._paths[file_id]
+            for region in active.values():
+                for done in region[1]:
+                    if done[-1] >= min_fingerprints:
+                        results.append({'path': path,
+                                        'lines': (done[3], done[4]),
+                                        'query_lines': (done[1], done[2]),
+                                        'fingerprints': done[-1]})
+        results.sort(key=lambda match: (match['query_lines'], match['path'],
+                                        match['lines']))
+        return results
+
+    def duplicates(self, min_fingerprints=1, max_repeats=MAX_REPEATS):
+        """Return (path, match) for every region of an indexed file that
+        matches a region of another, with matches as returned by `matches`.
+        Each pair of files is reported once, from the first path."""
+        results = []
+        for path in sorted(self.files):
+            for match in self.matches(_unpack(self.files[path]),
+                                      min_fingerprints, path, max_repeats):
+                if match['path'] > path:
+                    results.append((path, match))
+        return results
+
+    def _state(self):
+        return {'settings': self.settings}
+
+    def _job(self, path, lexer, engine, encoding):
+        return (path, lexer, engine, encoding, None, _fingerprint,
+                self.settings)
+
+    def _add(self, path, entry):
+        self.files[path] = entry
+        if self._free:
+            file_id = self._free.pop()
+            self._paths[file_id] = path
+        else:
+            file_id = len(self._paths)
+            self._paths.append(path)
+        self._ids[path] = file_id
+        # most hashes only occur in one file, so those map straight to its
+        # id rather than to a set.
+        postings = self._postings
+        for h in entry[2]:
+            ids = postings.get(h)
+            if ids is None:
+                postings[h] = file_id
+            elif isinstance(ids, int):
+                if ids != file_id:
+                    postings[h] = {ids, file_id}
+            else:
+                ids.add(file_id)
+
+    def _discard(self, path, entry):
+        file_id = self._ids.pop(path)
+        self._paths[file_id] = None
+        self._free.append(file_id)
+        self._located.pop(file_id, None)
+        postings = self._postings
+        for h in set(entry[2]):
+            ids = postings[h]
+            if isinstance(ids, int):
+                del postings[h]
+                continue
+            ids.discard(file_id)
+            if len(ids) == 1:
+                postings[h] = ids.pop()
+
+    def _locate(self, file_id):
+        """Map each hash of an indexed file to its indices in the file's
+        fingerprints.  The maps are kept until the file is removed."""
+        positions = {}
+        for j, h in enumerate(self.files[self._paths[file_id]][2]):
+            positions.setdefault(h, []).append(j)
+        return positions
+
+def _extend(active, window, position, first, last, entry, j):
+    """Add the pair of the query fingerprint at `position` and the `j`th
+    fingerprint of `entry` to the region on their diagonal in `active`,
+    or start a new one.
+
+    `active` maps each diagonal to [the current region, the regions
+    before it].  A region is [last query position, first query line, last
+    query line, first line, last line, count].
+    """
+    other = entry[3][j]
+    diagonal = position - other
+    found = active.get(diagonal)
+    if found is not None:
+        region = found[0]
+        if 0 < position - region[0] <= window:
+            region[0] = position
+            region[2] = max(region[2], last)
+            region[4] = max(region[4], entry[5][j])
+            region[5] = region[5] + 1
+            return
+    region = [position, first, last, entry[4][j], entry[5][j], 1]
+    if found is None:
+        active[diagonal] = [region, [region]]
+    else:
+        found[0] = region
+        found[1].append(region)
+
+def _pack(selected):
+    """Return the fingerprints as (hashes, positions, first lines, last
+    lines) arrays."""
+    hashes = array('Q')
+    positions = array('I')
+    firsts = array('I')
+    lasts = array('I')
+    for h, position, first, last in selected:
+        hashes.append(h)
+        positions.append(position)
+        firsts.append(first)
+        lasts.append(last)
+    return hashes, positions, firsts, lasts
+
+def _unpack(entry):
+    return list(zip(entry[2], entry[3], entry[4], entry[5]))
+
+def _fingerprint(s, tokens, k, window, identifiers, literals):
+    """Return the fingerprints of `tokens`, packed by `_pack`."""
+    return _pack(fingerprints(tokens, k, window, identifiers, literals))
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+    Includes
+    ~~~~~~~~
+
+    Finds the preprocessor directives of C and C++ files and builds the
+    graph of which files include which.
+
+    Rather than tokenizing whole files, a single regex skips over comments
+    and strings, using the same patterns as the C lexer, and picks out the
+    lines that start with '#'.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import json
+import os
+import re
+
+from plexer import LexCComment, LexCString, _walk_files
+
+# comments and strings are matched only to be skipped; an unterminated
+# block comment runs to the end of the input.
+_DIRECTIVES = re.compile(
+    r'(?P<skip>' + LexCComment.pattern + r'|/\*[\s\S]*|' +
+    LexCString.pattern + r')'
+    r'|^[ \t]*\#[ \t]*(?P<name>\w*)'
+    # the rest of the line, continued by backslashes; a comment ends it.
+    r'(?P<args>(?:[^\n\\/]|\\[\s\S]|/(?![/*]))*)',
+    re.MULTILINE)
+
+_INCLUDE = re.compile(r'\s*(?:<([^>\n]*)>|"([^"\n]*)")')
+
+# directives that name a file.
+INCLUDE_DIRECTIVES = ('include', 'include_next', 'import')
+
+# file extensions scanned when given a directory.
+SOURCE_EXTENSIONS = ('.c', '.h', '.cc', '.hh', '.cpp', '.hpp', '.cxx',
+                     '.hxx', '.inl', '.m', '.mm')
+
+def scan_directives(s):
+    """Return the preprocessor directives in `s`.
+
+    Each directive is a dict with its `name` ('include', 'define', ...),
+    its `args` (the rest of the line, including continuation lines), its
+    `text` and the `line` it starts on.  Directives inside comments and
+    strings are ignored.
+    """
+    directives = []
+    line = 1
+    last = 0
+    for m in _DIRECTIVES.finditer(s):
+        if m.lastgroup == 'skip':
+            continue
+        start = m.start()
+        line = line + s.count('\n', last, start)
+        last = start
+        directives.append({'name': m.group('name'),
+                           'args': m.group('args').strip(),
+                           'text': m.group().strip(),
+                           'line': line})
+    return directives
+
+def find_includes(s):
+    """Return the files included by `s`.
+
+    Each include is a dict with the included `path` as written, whether it
+    is a `system` include (written with <>), and its `line`.  Includes of
+    a macro are skipped.
+    """
+    includes = []
+    for directive in scan_directives(s):
+        if directive['name'] not in INCLUDE_DIRECTIVES:
+            continue
+        m = _INCLUDE.match(directive['args'])
+        if m is None:
+            continue
+        system = m.group(1) is not None
+        includes.append({'path': m.group(1) if system else m.group(2),
+                         'system': system,
+                         'line': directive['line']})
+    return includes
+
+def resolve_include(include, including_file, search_paths=()):
+    """Return the path of the file named by an include of `including_file`,
+    or None if it isn't found.
+
+    A quoted include is looked up next to the including file first, then
+    in `search_paths`, in order; a system include only in `search_paths`.
+    """
+    path = include['path']
+    if os.path.isabs(path):
+        return os.path.normpath(path) if os.path.isfile(path) else None
+    directories = list(search_paths)
+    if not include['system']:
+        directories.insert(0, os.path.dirname(including_file))
+    for directory in directories:
+        candidate = os.path.join(directory, path)
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+    return None
+
+#==============================================================================
+# IncludeCache
+#==============================================================================
+class IncludeCache:
+    """Remembers the includes of each file between runs.
+
+    A file is rescanned only when its size or modification time changed
+    and its contents hash differently than before.  The entries are kept
+    in the JSON file `path`, if given; call `save` to write them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def lookup(self, path):
+        """Return the cached includes of `path`, or None if it needs to be
+        scanned."""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_mtime_ns, st.st_size) == (entry['mtime_ns'], entry['size']):
+            return entry['includes']
+        # touched, but maybe not changed.
+        with open(path, 'rb') as f:
+            digest = _digest(f.read())
+        if digest != entry['sha1']:
+            return None
+        entry['mtime_ns'] = st.st_mtime_ns
+        entry['size'] = st.st_size
+        return entry['includes']
+
+    def store(self, path, mtime_ns, size, sha1, includes):
+        self.entries[path] = {'mtime_ns': mtime_ns,
+                              'size': size,
+                              'sha1': sha1,
+                              'includes': includes}
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+def _digest(data):
+    import hashlib
+    return hashlib.sha1(data).hexdigest()
+
+def _scan_file(path):
+    """Return (path, mtime_ns, size, sha1, includes), with includes None if
+    the file can't be read."""
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+    except OSError:
+        return path, None, None, None, None
+    includes = find_includes(data.decode('latin-1'))
+    return path, st.st_mtime_ns, st.st_size, _digest(data), includes
+
+#==============================================================================
+# IncludeGraph
+#==============================================================================
+class IncludeGraph:
+    """The include graph of a set of files.
+
+    `edges` maps each scanned file to the files it includes, in order, and
+    `unresolved` to the includes that weren't found.  Paths are normalized
+    as given, relative or absolute.
+    """
+
+    def __init__(self):
+        self.edges = {}
+        self.unresolved = {}
+
+    def transitive(self, path):
+        """Return the set of files `path` includes, directly or not."""
+        seen = set()
+        stack = list(self.edges.get(path, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.extend(self.edges.get(node, ()))
+        return seen
+
+    def dependents(self, path):
+        """Return the set of files that include `path`, directly or not."""
+        reverse = {}
+        for node, targets in self.edges.items():
+            for target in targets:
+                reverse.setdefault(target, []).append(node)
+        seen = set()
+        stack = list(reverse.get(path, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.extend(reverse.get(node, ()))
+        return seen
+
+def include_graph(paths, search_paths=(), jobs=None, cache=None):
+    """Build the transitive include graph of the files in `paths`.
+
+    Directories in `paths` are searched for C and C++ sources.  Every file
+    they include that can be resolved against `search_paths` (see
+    `resolve_include`) is scanned as well, and so on.  Files are scanned on
+    `jobs` worker processes, defaulting to the number of CPUs, and only if
+    `cache`, an `IncludeCache`, doesn't already know their includes.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if cache is None:
+        cache = IncludeCache()
+
+    graph = IncludeGraph()
+    pending = list(_walk_files(
+        paths, lambda ext: ext in SOURCE_EXTENSIONS))
+    seen = set(pending)
+    pool = None
+    try:
+        while pending:
+            found = {}
+            scan = []
+            for path in pending:
+                includes = cache.lookup(path)
+                if includes is None:
+                    scan.append(path)
+                else:
+                    cache.hits = cache.hits + 1
+                    found[path] = includes
+
+            if len(scan) > 1 and jobs > 1:
+                if pool is None:
+                    import multiprocessing
+                    pool = multiprocessing.Pool(jobs)
+                results = pool.imap(_scan_file, scan, 8)
+            else:
+                results = map(_scan_file, scan)
+            for path, mtime_ns, size, sha1, includes in results:
+                cache.misses = cache.misses + 1
+                if includes is not None:
+                    cache.store(path, mtime_ns, size, sha1, includes)
+                found[path] = includes
+
+            # the files included by this round are scanned in the next.
+            next_pending = []
+            for path in pending:
+                includes = found[path]
+                if includes is None:
+                    continue
+                targets = []
+                missing = []
+                for include in includes:
+                    target = resolve_include(include, path, search_paths)
+                    if target is None:
+                        missing.append(include['path'])
+                        continue
+                    targets.append(target)
+                    if target not in seen:
+                        seen.add(target)
+                        next_pending.append(target)
+                graph.edges[path] = targets
+                if missing:
+                    graph.unresolved[path] = missing
+            pending = next_pending
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return graph
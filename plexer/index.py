@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+    Identifier Index
+    ~~~~~~~~~~~~~~~~
+
+    An index of where every identifier appears across many files, kept up
+    to date by re-tokenizing only the files that changed.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import os
+import pickle
+from array import array
+
+import plexer
+from plexer import TYPE, LexError
+
+_VERSION = 1
+
+#==============================================================================
+# _FileIndex
+#==============================================================================
+class _FileIndex:
+    """What the indexes of many files share: keeping the entry of each file
+    up to date with its modification time and size, tokenizing the files
+    that changed on worker processes, and saving to a pickle file.
+
+    The entry of a file is a tuple starting with its `st_mtime_ns` and
+    `st_size`.  Subclasses give the worker job for a file in `_job`, turn
+    what the worker computed into an entry in `_entry`, and keep their
+    postings in step with `files` in `_add` and `_discard`.
+    """
+
+    _version = None
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def update(self, paths, jobs=None, lexer=None, engine='regex',
+               encoding=None):
+        """Index the files in `paths` that are new or were modified since
+        they were indexed, and drop indexed files that no longer exist.
+
+        Directories are searched for files whose extension has a registered
+        lexer, or for every file if `lexer` is given.  Files are tokenized
+        on `jobs` worker processes, as by `tokenize_files`.  Returns the
+        number of files that were (re)indexed.
+        """
+        for path in [path for path in self.files if not os.path.exists(path)]:
+            self.remove(path)
+        self.errors = {}
+
+        work = []
+        for path in plexer._source_files(paths, lexer):
+            entry = self.files.get(path)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                self.errors[path] = e
+                continue
+            if entry is None or entry[:2] != (st.st_mtime_ns, st.st_size):
+                work.append(self._job(path, lexer, engine, encoding))
+
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if jobs > 1 and len(work) > 1:
+            import multiprocessing
+            with multiprocessing.Pool(jobs) as pool:
+                results = list(pool.imap_unordered(_index_file, work, 8))
+        else:
+            results = map(_index_file, work)
+
+        count = 0
+        for path, entry, error in results:
+            self.remove(path)
+            if error is not None:
+                self.errors[path] = error
+                continue
+            self._add(path, self._entry(entry))
+            count = count + 1
+        return count
+
+    def remove(self, path):
+        """Drop `path` from the index."""
+        entry = self.files.pop(path, None)
+        if entry is not None:
+            self._discard(path, entry)
+
+    def save(self, path=None):
+        """Write the index to `path`, by default the one it was loaded
+        from."""
+        if path is None:
+            path = self.path
+        state = self._state()
+        state['version'] = self._version
+        state['files'] = self.files
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def _load(self):
+        """Return the state saved to `path`, or None if there is none or it
+        was saved by another version."""
+        if self.path is None or not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != self._version:
+            return None
+        return state
+
+    def _state(self):
+        """Return what to save besides the version and `files`."""
+        return {}
+
+    def _job(self, path, lexer, engine, encoding):
+        """Return the `_index_file` arguments for `path`."""
+        raise NotImplementedError
+
+    def _entry(self, entry):
+        """Return the entry to add for the one computed by a worker."""
+        return entry
+
+    def _add(self, path, entry):
+        self.files[path] = entry
+
+    def _discard(self, path, entry):
+        pass
+
+def _index_file(args):
+    """Return (path, entry, error), where entry is the file's mtime_ns and
+    size followed by what `payload(s, tokens, *options)` returns for its
+    text and its tokens of the types in `include`."""
+    path, lexer, engine, encoding, include, payload, options = args
+    try:
+        with open(path, encoding=encoding, newline='') as f:
+            st = os.fstat(f.fileno())
+            s = f.read()
+        tokens = plexer.tokenize(s, plexer._file_lexer(path, lexer), engine,
+                                 'array', include=include)
+    except (LexError, OSError, UnicodeDecodeError) as e:
+        return path, None, e
+    entry = (st.st_mtime_ns, st.st_size) + payload(s, tokens, *options)
+    return path, entry, None
+
+#==============================================================================
+# IdentifierIndex
+#==============================================================================
+class IdentifierIndex(_FileIndex):
+    """Maps identifiers to the (path, line, column) of each occurrence.
+
+    Names are interned to integer ids.  For every file, the index keeps the
+    (line, column) pairs of each name it contains in a flat array, and for
+    every name the set of files containing it, so a lookup only touches
+    the files it is found in.
+
+    The index is loaded from, and saved to, the pickle file `path` when
+    given.  `update` re-tokenizes new and modified files; `errors` holds
+    the files that couldn't be indexed by the last update.
+    """
+
+    _version = _VERSION
+
+    def __init__(self, path=None):
+        _FileIndex.__init__(self, path)
+        self.names = {}
+        self._postings = {}
+        state = self._load()
+        if state is not None:
+            for name in state['names']:
+                self.names[name] = len(self.names)
+            for path, entry in state['files'].items():
+                self._add(path, entry)
+
+    def __contains__(self, name):
+        return bool(self._postings.get(self.names.get(name)))
+
+    def lookup(self, name):
+        """Return the (path, line, column) of every occurrence of `name`,
+        sorted."""
+        name_id = self.names.get(name)
+        occurrences = []
+        for path in sorted(self._postings.get(name_id, ())):
+            positions = self.files[path][2][name_id]
+            for i in range(0, len(positions), 2):
+                occurrences.append((path, positions[i], positions[i + 1]))
+        return occurrences
+
+    def _state(self):
+        names = [None] * len(self.names)
+        for name, name_id in self.names.items():
+            names[name_id] = name
+        return {'names': names}
+
+    def _job(self, path, lexer, engine, encoding):
+        return (path, lexer, engine, encoding, {TYPE.IDENTIFIER},
+                _occurrences, ())
+
+    def _entry(self, entry):
+        mtime_ns, size, occurrences = entry
+        postings = {}
+        for name, positions in occurrences.items():
+            name_id = self.names.get(name)
+            if name_id is None:
+                name_id = self.names[name] = len(self.names)
+            postings[name_id] = positions
+        return mtime_ns, size, postings
+
+    def _add(self, path, entry):
+        self.files[path] = entry
+        for name_id in entry[2]:
+            self._postings.setdefault(name_id, set()).add(path)
+
+    def _discard(self, path, entry):
+        for name_id in entry[2]:
+            paths = self._postings[name_id]
+            paths.discard(path)
+            if not paths:
+                del self._postings[name_id]
+
+def _occurrences(s, tokens):
+    """Return a map of each identifier in `tokens` to a flat array of the
+    lines and columns it is found at."""
+    occurrences = {}
+    for start, end, line, column in zip(tokens.starts, tokens.ends,
+                                        tokens.lines, tokens.columns):
+        name = s[start:end]
+        positions = occurrences.get(name)
+        if positions is None:
+            positions = occurrences[name] = array('I')
+        positions.append(line)
+        positions.append(column)
+    return occurrences,
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+    Lexer Packs
+    ~~~~~~~~~~~
+
+    Lexers for more languages, one module per language.  Each module
+    defines its lexer as `lexer`, and is registered in LEXERS by
+    `plexer.LEXER_PACKS` so that it is only imported on first use.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import re
+import sys
+
+from plexer import LexError
+
+def regex_lexer(name, pattern, first_chars, error_patterns=()):
+    """Return a sub-lexer class that matches the regex `pattern`.
+
+    The class works with every engine: its `lex` matches `pattern` where
+    the token may start, and raises a LexError with the message of the
+    first of `error_patterns` ((regex, message) pairs) that matches
+    instead.  It is created in the calling module under `name`, which must
+    be the name it is assigned to so that lexers using it can be pickled.
+    """
+    regex = re.compile(pattern)
+    errors = tuple((re.compile(error), msg) for error, msg in error_patterns)
+
+    def lex(s, idx, end, ctx):
+        m = regex.match(s, idx, end)
+        if m is not None:
+            return m.end() - idx
+        for error, msg in errors:
+            if error.match(s, idx, end):
+                raise LexError(msg, ctx, s)
+        return 0
+
+    return type(name, (), {
+        '__doc__': 'Lex ' + pattern,
+        '__module__': sys._getframe(1).f_globals.get('__name__'),
+        'pattern': pattern,
+        'error_patterns': tuple(error_patterns),
+        'first_chars': first_chars,
+        'lex': staticmethod(lex),
+    })
+
+def delimited_lexer(name, open, close, message, escape=None):
+    """Return a sub-lexer class that matches from `open` to the first
+    `close` after it, such as a block comment or a string.
+
+    Rather than stepping through the token a character at a time, `lex`
+    jumps from one `close` to the next with `str.find`.  With `escape`, a
+    `close` preceded by an odd number of `escape` characters doesn't end
+    the token.  A token that is never closed raises a LexError with
+    `message`.  The class also has a `pattern`, so it works with every
+    engine, and is created in the calling module under `name` as by
+    `regex_lexer`.
+    """
+    body = len(open)
+    if escape is None:
+        pattern = re.escape(open) + r'[\s\S]*?' + re.escape(close)
+    else:
+        pattern = (re.escape(open) +
+                   r'(?:' + re.escape(escape) + r'[\s\S]|(?!' +
+                   re.escape(close) + r'|' + re.escape(escape) + r')[\s\S])*' +
+                   re.escape(close))
+
+    def lex(s, idx, end, ctx):
+        if not s.startswith(open, idx, end):
+            return 0
+        pos = s.find(close, idx + body, end)
+        while pos >= 0:
+            if escape is None:
+                return pos + len(close) - idx
+            # count the escape characters in front of it.
+            run = pos
+            while run > idx + body and s[run-1] == escape:
+                run = run - 1
+            if (pos - run) % 2 == 0:
+                return pos + len(close) - idx
+            pos = s.find(close, pos + 1, end)
+        raise LexError(message, ctx, s)
+
+    return type(name, (), {
+        '__doc__': 'Lex ' + open + '...' + close,
+        '__module__': sys._getframe(1).f_globals.get('__name__'),
+        'pattern': pattern,
+        'error_patterns': ((re.escape(open), message),),
+        'first_chars': open[0],
+        'lex': staticmethod(lex),
+    })
+
+# the rest of a line comment.
+REST_OF_LINE = r'(?:[^\r\n]|\r(?!\n))*'
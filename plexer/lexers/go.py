@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+    Go Lexer
+    ~~~~~~~~
+
+    :license: MIT, see LICENSE for more details.
+"""
+from plexer import LexCComment, Lexer
+from plexer.lexers import regex_lexer
+
+LexGoNumber = regex_lexer(
+    'LexGoNumber',
+    r'(?:0[xX](?:_?[0-9a-fA-F])+(?:\.[0-9a-fA-F_]*)?(?:[pP][+-]?[0-9_]+)?'
+    r'|0[oO](?:_?[0-7])+'
+    r'|0[bB](?:_?[01])+'
+    r'|[0-9](?:_?[0-9])*(?:\.(?:[0-9](?:_?[0-9])*)?)?'
+    r'(?:[eE][+-]?[0-9](?:_?[0-9])*)?)i?',
+    '0123456789')
+
+LexGoString = regex_lexer(
+    'LexGoString',
+    r'"(?:[^"\\\r\n]|\\[\s\S])*"'
+    r'|`[^`]*`'
+    r"|'(?:[^'\\\r\n]|\\[^\r\n]+?)'",
+    '"`\'',
+    [(r'["`\']', 'String not terminated')])
+
+lexer = Lexer(
+    lex_comment=LexCComment,
+    lex_number=LexGoNumber,
+    lex_string=LexGoString,
+    special_chars='.,:;!=-+/*%&|^~<>()[]{}',
+    identifier_chars='_')
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+    JavaScript Lexer
+    ~~~~~~~~~~~~~~~~
+
+    Template literals are lexed as one string, substitutions included.
+    Regular expression literals aren't recognized.
+
+    :license: MIT, see LICENSE for more details.
+"""
+from plexer import LexCComment, Lexer
+from plexer.lexers import regex_lexer
+
+LexJavaScriptNumber = regex_lexer(
+    'LexJavaScriptNumber',
+    r'0[xX](?:_?[0-9a-fA-F])+n?'
+    r'|0[oO](?:_?[0-7])+n?'
+    r'|0[bB](?:_?[01])+n?'
+    r'|[0-9](?:_?[0-9])*(?:n|(?:\.(?:[0-9](?:_?[0-9])*)?)?'
+    r'(?:[eE][+-]?[0-9](?:_?[0-9])*)?)',
+    '0123456789')
+
+LexJavaScriptString = regex_lexer(
+    'LexJavaScriptString',
+    r"'(?:[^'\\\r\n]|\\[\s\S])*'"
+    r'|"(?:[^"\\\r\n]|\\[\s\S])*"'
+    r'|`(?:[^`\\]|\\[\s\S])*`',
+    '\'"`',
+    [(r'[\'"`]', 'String not terminated')])
+
+lexer = Lexer(
+    lex_comment=LexCComment,
+    lex_number=LexJavaScriptNumber,
+    lex_string=LexJavaScriptString,
+    special_chars='.,:;!=-+/*%&|^~<>()[]{}?',
+    identifier_chars='_$')
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+    JSON Lexer
+    ~~~~~~~~~~
+
+    true, false and null are lexed as identifiers.
+
+    :license: MIT, see LICENSE for more details.
+"""
+from plexer import Lexer
+from plexer.lexers import regex_lexer
+
+LexJSONNumber = regex_lexer(
+    'LexJSONNumber',
+    r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?',
+    '-0123456789')
+
+LexJSONString = regex_lexer(
+    'LexJSONString',
+    r'"(?:[^"\\\r\n]|\\[\s\S])*"',
+    '"',
+    [(r'"', 'String not terminated')])
+
+lexer = Lexer(
+    lex_number=LexJSONNumber,
+    lex_string=LexJSONString,
+    special_chars='{}[]:,')
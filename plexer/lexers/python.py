@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+    Python Lexer
+    ~~~~~~~~~~~~
+
+    String prefixes (r, b, f, ...) are lexed as identifiers in front of the
+    string.
+
+    :license: MIT, see LICENSE for more details.
+"""
+from plexer import Lexer
+from plexer.lexers import REST_OF_LINE, regex_lexer
+
+LexPythonComment = regex_lexer(
+    'LexPythonComment', '#' + REST_OF_LINE, '#')
+
+LexPythonNumber = regex_lexer(
+    'LexPythonNumber',
+    r'0[xX](?:_?[0-9a-fA-F])+'
+    r'|0[oO](?:_?[0-7])+'
+    r'|0[bB](?:_?[01])+'
+    r'|[0-9](?:_?[0-9])*(?:\.(?:[0-9](?:_?[0-9])*)?)?'
+    r'(?:[eE][+-]?[0-9](?:_?[0-9])*)?[jJ]?',
+    '0123456789')
+
+LexPythonString = regex_lexer(
+    'LexPythonString',
+    r"'''(?:[^'\\]|\\[\s\S]|'(?!''))*'''"
+    r'|"""(?:[^"\\]|\\[\s\S]|"(?!""))*"""'
+    r"|'(?!'')(?:[^'\\\r\n]|\\[\s\S])*'"
+    r'|"(?!"")(?:[^"\\\r\n]|\\[\s\S])*"',
+    '\'"',
+    [(r"'''|\"\"\"", 'Triple-quoted string not terminated'),
+     (r'[\'"]', 'String not terminated')])
+
+lexer = Lexer(
+    lex_comment=LexPythonComment,
+    lex_number=LexPythonNumber,
+    lex_string=LexPythonString,
+    special_chars='.,:;!=-+/*%&|^~<>()[]{}@',
+    identifier_chars='_')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+    Rust Lexer
+    ~~~~~~~~~~
+
+    Block comments nest, which a regex can't match, so this lexer is
+    always driven by the python engine (or numpy).  A quote that doesn't
+    start a character literal is part of a lifetime, which is lexed as an
+    identifier.  Raw strings aren't recognized.
+
+    :license: MIT, see LICENSE for more details.
+"""
+import re
+
+from plexer import LexError, Lexer
+from plexer.lexers import regex_lexer
+
+_NESTING = re.compile(r'/\*|\*/')
+
+class LexRustComment:
+    """Lex a line comment, or a block comment that may contain others."""
+
+    pattern = None
+    first_chars = '/'
+
+    @staticmethod
+    def lex(s, idx, end, ctx):
+        if idx + 1 >= end or s[idx] != '/':
+            return 0
+
+        # line comment.
+        if s[idx+1] == '/':
+            eol = s.find('\n', idx, end)
+            if eol < 0:
+                return end - idx
+            if s[eol-1] == '\r':
+                eol = eol - 1
+            return eol - idx
+
+        if s[idx+1] != '*':
+            return 0
+
+        # block comment.
+        depth = 1
+        pos = idx + 2
+        while depth > 0:
+            m = _NESTING.search(s, pos, end)
+            if m is None:
+                raise LexError("Unterminated block comment", ctx, s)
+            if m.group() == '/*':
+                depth = depth + 1
+            else:
+                depth = depth - 1
+            pos = m.end()
+        return pos - idx
+
+LexRustNumber = regex_lexer(
+    'LexRustNumber',
+    r'(?:0x[0-9a-fA-F_]+|0o[0-7_]+|0b[01_]+'
+    r'|[0-9][0-9_]*(?:\.[0-9][0-9_]*)?(?:[eE][+-]?[0-9_]+)?)'
+    r'(?:[iu](?:8|16|32|64|128|size)|f32|f64)?',
+    '0123456789')
+
+LexRustString = regex_lexer(
+    'LexRustString',
+    r'"(?:[^"\\]|\\[\s\S])*"'
+    r"|'(?:[^'\\\r\n]|\\(?:u\{[0-9a-fA-F_]*\}|x[0-9a-fA-F]{2}|[^\r\n]))'",
+    '"\'',
+    [(r'"', 'String not terminated')])
+
+lexer = Lexer(
+    lex_comment=LexRustComment,
+    lex_number=LexRustNumber,
+    lex_string=LexRustString,
+    special_chars='.,:;!=-+/*%&|^~<>()[]{}?#@$',
+    identifier_chars='_')
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+    Shell Lexer
+    ~~~~~~~~~~~
+
+    For sh and its relatives.  A '#' only starts a comment at the start of
+    a word.  Here-documents aren't recognized.
+
+    :license: MIT, see LICENSE for more details.
+"""
+from plexer import Lexer
+from plexer.lexers import REST_OF_LINE, regex_lexer
+
+LexShellComment = regex_lexer(
+    'LexShellComment', r'(?<![^\s;|&(){}<>])#' + REST_OF_LINE, '#')
+
+LexShellNumber = regex_lexer(
+    'LexShellNumber', r'[0-9]+', '0123456789')
+
+LexShellString = regex_lexer(
+    'LexShellString',
+    r"'[^']*'"
+    r'|"(?:[^"\\]|\\[\s\S])*"',
+    '\'"',
+    [(r'[\'"]', 'String not terminated')])
+
+lexer = Lexer(
+    lex_comment=LexShellComment,
+    lex_number=LexShellNumber,
+    lex_string=LexShellString,
+    special_chars='|&;()<>{}[]=$!*?~,:+-/%^@`\\',
+    identifier_chars='_')
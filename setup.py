@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 from setuptools import setup
 
-modules = \
-['plexer']
+packages = \
+['plexer', 'plexer.lexers']
 setup_kwargs = {
     'name': 'plexer',
     'version': '1.1.0',
@@ -13,8 +13,9 @@ setup_kwargs = {
     'maintainer': 'None',
     'maintainer_email': 'None',
     'url': 'https://github.com/shawwn/plexer',
-    'py_modules': modules,
+    'packages': packages,
     'python_requires': '>=3.6,<4.0',
+    'extras_require': {'numpy': ['numpy']},
 }
 
 
@@ -7,10 +7,29 @@
     :copyright: (c) 2010 by Shawn Presser.
     :license: MIT, see LICENSE for more details.
 """
+import asyncio
+import io
+import itertools
+import json
 import os
 import sys
+import tempfile
 import unittest
-from plexer import LexError, TYPE, TYPE_NAMES, tokenize_lines
+from unittest import mock
+import plexer
+from plexer import aio, binary, fingerprint, includes
+from plexer.index import IdentifierIndex
+from plexer import __main__ as plexer_main
+from benchmarks import corpus
+from benchmarks import __main__ as benchmarks_main
+from plexer import (LexError, LexStats, Lexer, LineIndex, TYPE, TYPE_NAMES, TokenArray,
+                    TokenCache, register_lexer, iter_tokens, retokenize,
+                    tokenize, tokenize_files, tokenize_lines, tokenize_path)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 example_path = os.path.join(os.path.dirname(__file__), '..', 'examples')
 sys.path.append(os.path.join(example_path, 'print_c_includes'))
@@ -63,6 +82,1248 @@ class BasicFunctionalityTestCase(unittest.TestCase):
             assert e.row == 2
             assert e.col == 14
 
+    def test_c_comments_and_strings(self):
+        tokens = tokenize('// a /* b\r\n/* c\n * d **/x"e\\"f" "" //',
+                          lexer='c')
+        assert [token['value'] for token in tokens] == [
+            '// a /* b', '\r\n', '/* c\n * d **/', 'x', '"e\\"f"', ' ', '""',
+            ' ', '//']
+
+
+C_SOURCE = (
+    '#include <stdio.h>\n'
+    '/* a block\n'
+    '   comment */ int main(int argc, char **argv) {\r\n'
+    '\tchar q = \'"\', e = \'\\"\'; // line comment\n'
+    '\treturn -42 + .9f + 2.5e-3f + 51UL + 5. + argv[0][1] - 1a;\n'
+    '}\n'
+    'L"wide \\" string" x\\"y\r\r\n')
+
+class RegexEngineTestCase(unittest.TestCase):
+
+    def test_same_tokens_as_python_engine(self):
+        for lexer in ('c', 'txt'):
+            assert tokenize(C_SOURCE, lexer, engine='regex') == \
+                tokenize(C_SOURCE, lexer, engine='python')
+
+    def test_same_errors_as_python_engine(self):
+        for source in ('int i = 42; /* test \n', 'x = "unterminated;\n'):
+            errors = []
+            for engine in ('python', 'regex'):
+                with self.assertRaises(LexError) as cm:
+                    tokenize(source, 'c', engine=engine)
+                errors.append((cm.exception.msg, cm.exception.row,
+                               cm.exception.col))
+            assert errors[0] == errors[1]
+
+    def test_uncompilable_lexer_falls_back(self):
+        class LexAnything:
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                return 1 if s[idx] == '@' else 0
+
+        lexer = Lexer(lex_number=LexAnything)
+        assert lexer.compile() is None
+        register_lexer('at', lexer)
+        tokens = tokenize('@b @', 'at', engine='regex')
+        assert [t['value'] for t in tokens] == ['@', 'b', ' ', '@']
+
+
+class LexerOptionsTestCase(unittest.TestCase):
+
+    SOURCE = 'p->x <<= a::b == c || d;\n    y %= 2 ... .5 e|f\n'
+
+    def test_operators(self):
+        lexer = plexer.get_lexer('cpp').copy(operators=plexer.C_OPERATORS)
+        values = [t['value'] for t in tokenize(self.SOURCE, lexer)
+                  if t['type'] == TYPE.SPECIAL]
+        assert values == ['->', '<<=', '::', '==', '||', ';', '%=', '...',
+                          '.', '|']
+        # the lexer it was copied from is unchanged.
+        assert [t['value'] for t in tokenize('a->b', 'cpp')] == \
+            ['a', '-', '>', 'b']
+
+    def test_coalesce_whitespace(self):
+        lexer = plexer.get_lexer('cpp').copy(coalesce_whitespace=True)
+        values = [t['value'] for t in tokenize(self.SOURCE, lexer)
+                  if t['type'] == TYPE.WHITESPACE]
+        assert values[-6:] == ['    ', ' ', ' ', ' ', ' ', ' ']
+        assert tokenize(' \t x', lexer)[0]['value'] == ' \t '
+
+    def test_engines(self):
+        lexer = plexer.get_lexer('cpp').copy(operators=plexer.C_OPERATORS,
+                                             coalesce_whitespace=True)
+        assert lexer.fingerprint() != plexer.get_lexer('cpp').fingerprint()
+        for source in (C_SOURCE, self.SOURCE):
+            tokens = tokenize(source, lexer)
+            assert ''.join(t['value'] for t in tokens) == source
+            for engine in ('regex', 'numpy' if numpy else 'python'):
+                assert tokenize(source, lexer, engine) == tokens, engine
+        assert len(tokens) < len(tokenize(self.SOURCE, 'cpp'))
+
+
+class StreamingTestCase(unittest.TestCase):
+
+    def test_tokens_straddling_chunks(self):
+        # split inside a block comment, a string, a number, an identifier
+        # and a windows newline.
+        chunks = ['#inc', 'lude <stdio.h>\n/* a bl', 'ock\n   comment */ int main(int a',
+                  'rgc, char **argv) {\r', '\n\tchar q = \'"\', e = \'\\"\'; // line comment\n\treturn -4',
+                  '2 + .9f + 2.5e', '-3f + 51UL + 5. + argv[0][1] - 1a;\n}\nL"wide \\" st',
+                  'ring" x\\"y\r\r\n']
+        assert ''.join(chunks) == C_SOURCE
+        for engine in ('python', 'regex'):
+            assert list(iter_tokens(chunks, 'c', engine)) == \
+                tokenize(C_SOURCE, 'c', engine)
+
+    def test_file_object(self):
+        source = io.StringIO(C_SOURCE * 20)
+        assert list(iter_tokens(source, 'c', chunk_size=7)) == \
+            tokenize(C_SOURCE * 20, 'c')
+
+    def test_error_position(self):
+        chunks = ['int i;\n' * 3, 'int j = 42; /* test \n', '\n' * 3]
+        with self.assertRaises(LexError) as cm:
+            list(iter_tokens(chunks, 'c'))
+        assert cm.exception.row == 4
+        assert cm.exception.col == 13
+
+    def test_long_line(self):
+        # no newline at all: the line is split before its last whitespace
+        # rather than buffered whole.
+        source = 'x = "a b" + 1.5e3 /* c d */ - y;\t' * 400
+        read = []
+
+        def chunks():
+            for i in range(0, len(source), 100):
+                read.append(i)
+                yield source[i:i + 100]
+
+        tokens = iter_tokens(chunks(), 'c', chunk_size=256)
+        first = next(tokens)
+        assert len(read) < 5
+        assert [first] + list(tokens) == tokenize(source, 'c')
+
+        chunks = [source[i:i + 100] for i in range(0, len(source), 100)]
+        with self.assertRaises(LexError) as cm:
+            list(iter_tokens(chunks + ['x "open'], 'c', chunk_size=256))
+        assert (cm.exception.row, cm.exception.col) == (1, len(source) + 3)
+
+    def test_tokens_ending_lines(self):
+        # the last token of a run of lines needn't be a newline.
+        class LexParagraph:
+            first_chars = '#'
+
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                close = s.find('\n\n', idx, end)
+                if close < 0:
+                    raise LexError('Unterminated paragraph', ctx, s)
+                return close + 2 - idx
+        lexer = Lexer(lex_comment=LexParagraph, special_chars='=')
+        source = 'a = 1 # one\ntwo\n\nb = 2\n'
+        assert list(iter_tokens([source[:17], source[17:]], lexer)) == \
+            tokenize(source, lexer)
+
+
+class TokenArrayTestCase(unittest.TestCase):
+
+    def test_same_tokens_as_dicts(self):
+        tokens = tokenize(C_SOURCE, 'c', result='array')
+        assert isinstance(tokens, TokenArray)
+        assert len(tokens) == len(tokenize(C_SOURCE, 'c'))
+        assert tokens.to_dicts() == tokenize(C_SOURCE, 'c')
+        assert list(tokens) == tokenize(C_SOURCE, 'c', engine='regex')
+
+    def test_token_view(self):
+        tokens = tokenize('int i = 42;', 'c', result='array')
+        token = tokens[-2]
+        assert token.type == TYPE.NUMBER
+        assert token.name == 'number'
+        assert token.value == '42'
+        assert (token.start, token.end) == (8, 10)
+        assert token['value'] == '42'
+        assert tokens.value(0) == 'int'
+        assert not hasattr(token, '__dict__')
+
+    def test_tokenize_lines(self):
+        lines = tokenize_lines('#include <stdio.h>\nint i;\n', lexer='c',
+                               result='array')
+        assert len(lines) == 2
+        assert lines[0][0]['value'] == '#include'
+        assert [t.name for t in lines[1]] == \
+            ['identifier', 'whitespace', 'identifier', 'special']
+
+
+class DispatchTestCase(unittest.TestCase):
+
+    def test_sublexers_only_called_at_first_chars(self):
+        calls = []
+
+        class LexHash:
+            first_chars = '#'
+
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                calls.append(s[idx])
+                return 1
+
+        lexer = Lexer(lex_comment=LexHash, special_chars=';')
+        table, default, identifier = lexer.dispatch()
+        assert default == ()
+        assert [type for type, lex in table['#']] == [TYPE.COMMENT]
+        register_lexer('hash', lexer)
+        tokens = tokenize('a#b; c#', 'hash')
+        assert calls == ['#', '#']
+        assert [t['value'] for t in tokens] == ['a', '#', 'b', ';', ' ', 'c', '#']
+
+    def test_undeclared_sublexer_tried_everywhere(self):
+        class LexUndeclared:
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                return 0
+
+        lexer = Lexer(lex_number=LexUndeclared, special_chars='+')
+        table, default, identifier = lexer.dispatch()
+        assert [type for type, lex in default] == [TYPE.NUMBER]
+        assert [type for type, lex in table['+']] == [TYPE.SPECIAL, TYPE.NUMBER]
+        assert identifier is None
+
+    def test_subclass_without_init(self):
+        # subclasses written before Lexer had `operators` and
+        # `coalesce_whitespace` set the other attributes themselves.
+        class HashLexer(Lexer):
+            def __init__(self):
+                self.lex_comment = plexer.LexNothing
+                self.lex_number = plexer.LexNothing
+                self.lex_string = plexer.LexNothing
+                self.special_chars = '#;'
+                self.identifier_chars = ''
+
+        lexer = HashLexer()
+        for engine in ('python', 'regex'):
+            assert [t['value'] for t in tokenize('a#b;', lexer, engine)] == \
+                ['a', '#', 'b', ';'], engine
+        assert lexer.fingerprint() == HashLexer().fingerprint()
+
+
+class LineIndexTestCase(unittest.TestCase):
+
+    def test_lookup(self):
+        index = LineIndex('ab\ncd\r\n\nef')
+        assert len(index) == 4
+        assert index.position(0) == (1, 1)
+        assert index.position(2) == (1, 3)
+        assert index.position(3) == (2, 1)
+        assert index.position(5) == (2, 3)
+        assert index.position(7) == (3, 1)
+        assert index.line(9) == 4
+        assert index.column(9) == 2
+
+    def test_positions_after_multiline_tokens(self):
+        for engine in ('python', 'regex'):
+            tokens = tokenize('a /* x\n y */ b "s\\\nt" c\nd', 'c', engine)
+            positions = [(t['value'], t['line'], t['column'])
+                         for t in tokens if t['type'] != TYPE.WHITESPACE]
+            assert positions == [
+                ('a', 1, 1), ('/* x\n y */', 1, 3), ('b', 2, 7),
+                ('"s\\\nt"', 2, 9), ('c', 3, 4), ('\n', 3, 5), ('d', 4, 1)]
+
+    def test_error_uses_index(self):
+        with self.assertRaises(LexError) as cm:
+            tokenize('int i;\n  "abc\n', 'c')
+        assert cm.exception.ctx['lines'] is not None
+        assert (cm.exception.row, cm.exception.col) == (2, 3)
+        assert (cm.exception.ctx['line'], cm.exception.ctx['column']) == (2, 3)
+
+
+class TokenizeFilesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name, text in (('a.c', C_SOURCE),
+                           ('b.h', '#include <stdio.h>\n'),
+                           ('bad.c', 'int i; /* open\n'),
+                           ('notes.txt', 'pi is 3.14\n'),
+                           ('unknown.zzz', 'x\n'),
+                           ('missing.c', None)):
+            path = os.path.join(self.dir.name, name)
+            if text is not None:
+                with open(path, 'w') as f:
+                    f.write(text)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def check(self, results):
+        results = dict((os.path.basename(path), (tokens, error))
+                       for path, tokens, error in results)
+        assert sorted(results) == sorted(map(os.path.basename, self.paths))
+        assert results['a.c'][0].to_dicts() == tokenize(C_SOURCE, 'c')
+        assert results['b.h'][0][0].value == '#include'
+        assert results['notes.txt'][0][-2].value == '3.14'
+        assert results['bad.c'][1].row == 1
+        assert results['bad.c'][1].col == 8
+        assert isinstance(results['unknown.zzz'][1], LexError)
+        assert isinstance(results['missing.c'][1], OSError)
+
+    def test_serial(self):
+        self.check(tokenize_files(self.paths, jobs=1))
+
+    def test_parallel(self):
+        results = list(tokenize_files(self.paths, jobs=2, chunksize=2))
+        assert [path for path, tokens, error in results] == self.paths
+        self.check(results)
+
+    def test_unordered(self):
+        self.check(tokenize_files(self.paths, jobs=2, ordered=False))
+
+    def test_rebuilt(self):
+        # workers send back the arrays; the source is read again here.
+        path = os.path.join(self.dir.name, 'c.c')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('char *s = "\u00fc\u00df";\nx /* open\n')
+        serial, parallel = [
+            list(tokenize_files([path, path], jobs, encoding='utf-8',
+                                recover=True))[0][1]
+            for jobs in (1, 2)]
+        assert parallel.to_dicts() == serial.to_dicts()
+        assert parallel.lexer is plexer.LEXERS['c']
+        # offsets count characters of the decoded text.
+        assert [token.start for token in parallel if token.value == ';'] \
+            == [14]
+        assert [(e.msg, e.row, e.col) for e in parallel.diagnostics] == \
+            [('Unterminated C block comment', 2, 3)]
+
+    def test_changed(self):
+        # a file rewritten after a worker lexed it isn't sliced with the
+        # old tokens.
+        path = self.paths[0]
+        args = (path, None, 'python', None, None, None, False)
+        result = plexer._lex_file(args)
+        with open(path, 'w') as f:
+            f.write(C_SOURCE + 'int j;\n')
+        _, tokens, error = plexer._load_file(result, None, None)
+        assert tokens is None and isinstance(error, OSError)
+        _, tokens, error = plexer._load_file(plexer._lex_file(args), None,
+                                             None)
+        assert error is None and tokens[-2].value == ';'
+
+
+class ParallelTokenizeTestCase(unittest.TestCase):
+
+    def test_same_tokens_as_sequential(self):
+        # small segments so that some start inside the block comment and
+        # the wide string.
+        source = C_SOURCE * 10 + '/*\n' * 30 + '*/\n' + '"\\\n' * 9 + '"\n'
+        engines = ['python', 'regex'] + (['numpy'] if numpy is not None else [])
+        with mock.patch.object(plexer, '_MIN_SEGMENT', 16):
+            for engine in engines:
+                assert tokenize(source, 'c', engine, jobs=2) == \
+                    tokenize(source, 'c', engine)
+
+    def test_arrays(self):
+        source = C_SOURCE * 10 + '/*\n' * 30 + '*/\n' + 'x = "\u00fc";\n' * 9
+        engines = ['python', 'regex'] + (['numpy'] if numpy is not None else [])
+        with mock.patch.object(plexer, '_MIN_SEGMENT', 16):
+            for s, engine in itertools.product(
+                    (source, source.encode('utf-8')), engines):
+                for kwargs in ({}, {'exclude': {TYPE.WHITESPACE}},
+                               {'include': {TYPE.IDENTIFIER}}):
+                    tokens = tokenize(s, 'c', engine, 'array', jobs=2,
+                                      **kwargs)
+                    expected = tokenize(s, 'c', 'python', 'array', **kwargs)
+                    assert tokens.to_dicts() == expected.to_dicts(), engine
+                    assert tokens.starts == expected.starts
+            assert tokenize('x;', 'c', jobs=2) == tokenize('x;', 'c')
+            assert tokenize('', 'c', jobs=2) == []
+            diagnostics = []
+            expected = tokenize(source + '"open\n', 'c',
+                                diagnostics=diagnostics)
+            tokens = tokenize(source + '"open\n', 'c', result='array',
+                              jobs=2, diagnostics=[])
+            assert tokens.to_dicts() == expected
+            assert [(e.row, e.col) for e in tokens.diagnostics] == \
+                [(e.row, e.col) for e in diagnostics]
+
+    def test_same_error_as_sequential(self):
+        source = C_SOURCE * 10 + '/* never closed\n' + 'int i;\n' * 50
+        with mock.patch.object(plexer, '_MIN_SEGMENT', 16):
+            with self.assertRaises(LexError) as cm:
+                tokenize(source, 'c', jobs=2)
+        assert (cm.exception.row, cm.exception.col) == (71, 1)
+
+
+class RetokenizeTestCase(unittest.TestCase):
+
+    def check(self, source, offset, removed_len, inserted_text):
+        tokens = tokenize(source, 'c', result='array')
+        new = retokenize(tokens, offset, removed_len, inserted_text)
+        expected = source[:offset] + inserted_text + \
+            source[offset + removed_len:]
+        assert new.source == expected
+        assert new.to_dicts() == tokenize(expected, 'c')
+        return new
+
+    def test_edits(self):
+        source = C_SOURCE * 3
+        self.check(source, 0, 0, 'x')
+        self.check(source, len(source), 0, '\nint j;')
+        self.check(source, 40, 5, '')
+        self.check(source, 100, 0, '\n\n/* new */\n')
+        self.check(source, 20, 30, 'y')
+        # opening and closing block comments changes every token up to
+        # the next '*/'.
+        self.check(source, 0, 0, '/*')
+        self.check(source, 19, 3, '')
+
+    def test_only_relexes_edited_lines(self):
+        source = 'int i;\n' * 1000
+        spans = []
+        lex = plexer._lex
+
+        def counting_lex(*args):
+            for span in lex(*args):
+                spans.append(span)
+                yield span
+
+        tokens = tokenize(source, 'c', result='array')
+        with mock.patch.object(plexer, '_lex', counting_lex):
+            new = retokenize(tokens, 3507, 1, 'jk')
+        assert new.to_dicts() == tokenize(new.source, 'c')
+        assert len(spans) == 5
+
+
+class TokenCacheTestCase(unittest.TestCase):
+
+    def test_memory_lru(self):
+        cache = TokenCache(maxsize=2)
+        tokens = cache.tokenize(C_SOURCE, 'c')
+        assert tokens == tokenize(C_SOURCE, 'c')
+        tokens[0]['value'] = 'changed'
+        assert cache.tokenize(C_SOURCE, 'c') == tokenize(C_SOURCE, 'c')
+        assert cache.tokenize_lines(C_SOURCE, lexer='c') == \
+            tokenize_lines(C_SOURCE, lexer='c')
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        # a different lexer configuration is a different entry.
+        assert cache.tokenize(C_SOURCE, 'txt') == tokenize(C_SOURCE, 'txt')
+        assert cache.misses == 2
+        cache.tokenize('a', 'c')
+        cache.tokenize(C_SOURCE, 'c')
+        assert cache.stats()['misses'] == 4
+        assert cache.stats()['entries'] == 2
+
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TokenCache(directory=directory)
+            cache.tokenize(C_SOURCE, 'c', result='array')
+            cache = TokenCache(directory=directory)
+            tokens = cache.tokenize(C_SOURCE, 'c', result='array')
+            assert tokens.to_dicts() == tokenize(C_SOURCE, 'c')
+            assert (cache.disk_hits, cache.misses) == (1, 0)
+
+    def test_directory_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TokenCache(directory=directory, max_bytes=3000)
+            for i in range(10):
+                cache.tokenize(C_SOURCE + str(i), 'c')
+            assert 0 < len(os.listdir(directory)) < 10
+            assert cache.stats()['disk_bytes'] <= 3000
+
+    def test_fingerprint(self):
+        c = plexer.LEXERS['c']
+        assert c.fingerprint() == plexer.LEXERS['cpp'].fingerprint()
+        assert c.fingerprint() != plexer.LEXERS['txt'].fingerprint()
+        assert c.fingerprint() != Lexer(
+            lex_comment=c.lex_comment, lex_number=c.lex_number,
+            lex_string=c.lex_string, special_chars='+').fingerprint()
+
+        # the constants and names a sub-lexer's code uses count, not just
+        # its bytecode.
+        class LexFind:
+            first_chars = "'"
+
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                close = s.find("'", idx + 1, min(end, idx + 8))
+                return close + 1 - idx if close >= 0 else 0
+        class LexLimit(LexFind):
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                close = s.find("'", idx + 1, min(end, idx + 9))
+                return close + 1 - idx if close >= 0 else 0
+        class LexRfind(LexFind):
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                close = s.rfind("'", idx + 1, min(end, idx + 8))
+                return close + 1 - idx if close >= 0 else 0
+        fingerprints = set()
+        for sublexer in (LexFind, LexLimit, LexRfind):
+            sublexer.__qualname__ = 'LexQuoted'
+            fingerprints.add(c.copy(lex_string=sublexer).fingerprint())
+        assert len(fingerprints) == 3
+
+    def test_fingerprint_across_processes(self):
+        # fingerprints key caches on disk, so they can't depend on the
+        # hash seed of the process.
+        import subprocess
+        code = ('import plexer; '
+                'print(plexer.get_lexer("c").copy('
+                'operators=plexer.C_OPERATORS).fingerprint(), '
+                'plexer.get_lexer("py").fingerprint())')
+        root = os.path.join(os.path.dirname(__file__), '..')
+        outputs = set()
+        for seed in ('1', '2', '3'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            outputs.add(subprocess.check_output(
+                [sys.executable, '-c', code], cwd=root, env=env))
+        assert len(outputs) == 1
+
+
+class BytesInputTestCase(unittest.TestCase):
+
+    def test_bytes_like(self):
+        data = C_SOURCE.encode('utf-8')
+        expected = tokenize(C_SOURCE, 'c')
+        for engine in ('python', 'regex'):
+            for s in (data, bytearray(data), memoryview(data)):
+                assert tokenize(s, 'c', engine) == expected
+
+    def test_byte_offsets(self):
+        tokens = tokenize('x = "\u00fc"; y'.encode('utf-8'), 'c', 'regex', 'array')
+        assert tokens[4].value == '"\u00fc"'
+        # the two bytes of the \u00fc count towards offsets and columns.
+        assert (tokens[5].value, tokens[5].start, tokens[5].column) == (';', 8, 9)
+        assert len(tokens) == 8
+
+    def test_error_position(self):
+        # errors without a LineIndex find their position in the bytes.
+        for s in (b'x', bytearray(b'ab\ncd'), memoryview(b'ab\ncd')):
+            with self.assertRaises(LexError) as cm:
+                tokenize(s, 'zzz')
+            assert (cm.exception.row, cm.exception.col) == (1, 1)
+        e = LexError('Unknown', {'pos': 4}, b'ab\ncd')
+        assert (e.row, e.col) == (2, 2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.zzz')
+            with open(path, 'wb') as f:
+                f.write(b'x\n')
+            with self.assertRaises(LexError) as cm:
+                tokenize_path(path)
+            assert (cm.exception.row, cm.exception.col) == (1, 1)
+
+    def test_tokenize_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.c')
+            with open(path, 'wb') as f:
+                f.write(C_SOURCE.encode('utf-8'))
+            tokens = tokenize_path(path)
+            assert tokens.to_dicts() == tokenize(C_SOURCE, 'c')
+            edited = retokenize(tokens, 0, 0, b'int z;\n', engine='regex')
+            assert edited.to_dicts() == tokenize('int z;\n' + C_SOURCE, 'c')
+
+            empty = os.path.join(directory, 'empty.c')
+            open(empty, 'wb').close()
+            assert len(tokenize_path(empty)) == 0
+
+    def test_parallel(self):
+        data = (C_SOURCE * 20).encode('utf-8')
+        with mock.patch.object(plexer, '_MIN_SEGMENT', 16):
+            tokens = tokenize(memoryview(data), 'c', 'regex', 'array', jobs=2)
+        assert tokens.to_dicts() == tokenize(C_SOURCE * 20, 'c')
+
+
+class LexStatsTestCase(unittest.TestCase):
+
+    def test_engines(self):
+        for engine in ('python', 'regex'):
+            stats = LexStats()
+            tokens = tokenize(C_SOURCE, 'c', engine, stats=stats)
+            assert tokens == tokenize(C_SOURCE, 'c', engine)
+            assert sum(stats.chars.values()) == len(C_SOURCE)
+            assert sum(stats.tokens.values()) == len(tokens)
+            assert stats.tokens['comment'] == stats.matches['LexCComment']
+            assert stats.calls['LexCComment'] >= stats.matches['LexCComment']
+            assert stats.total_seconds > 0
+            assert 'LexCString' in str(stats)
+
+    def test_callback(self):
+        reports = []
+        lines = tokenize_lines(C_SOURCE, lexer='c', stats=reports.append)
+        assert lines == tokenize_lines(C_SOURCE, lexer='c')
+        assert len(reports) == 1
+        assert reports[0].as_dict()['tokens']['identifier'] > 0
+
+    def test_undeclared_first_chars(self):
+        class LexAt:
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                return 1 if s[idx] == '@' else 0
+        stats = LexStats()
+        tokenize('a@b', Lexer(lex_string=LexAt), stats=stats)
+        assert stats.calls['LexAt'] == 3
+        assert stats.matches['LexAt'] == 1
+
+
+class TypeFilterTestCase(unittest.TestCase):
+
+    def test_exclude(self):
+        skipped = {TYPE.WHITESPACE, TYPE.NEWLINE, TYPE.COMMENT}
+        expected = [token for token in tokenize(C_SOURCE, 'c')
+                    if token['type'] not in skipped]
+        for engine in ('python', 'regex'):
+            assert tokenize(C_SOURCE, 'c', engine, exclude=skipped) == expected
+        tokens = tokenize(C_SOURCE, 'c', result='array', exclude=skipped)
+        assert tokens.to_dicts() == expected
+
+    def test_include(self):
+        tokens = tokenize(C_SOURCE, 'c', include=[TYPE.STRING, TYPE.NUMBER],
+                          exclude=[TYPE.NUMBER])
+        assert tokens == [token for token in tokenize(C_SOURCE, 'c')
+                          if token['type'] == TYPE.STRING]
+
+    def test_lines(self):
+        lines = tokenize_lines(C_SOURCE, lexer='c', exclude={TYPE.NEWLINE,
+                                                             TYPE.WHITESPACE})
+        expected = [[token for token in line
+                     if token['type'] != TYPE.WHITESPACE]
+                    for line in tokenize_lines(C_SOURCE, lexer='c')]
+        assert lines == expected
+        lines = tokenize_lines(C_SOURCE, False, lexer='c',
+                               include={TYPE.NEWLINE})
+        assert all(len(line) == 1 for line in lines[:-1])
+
+
+class TokenLinesTestCase(unittest.TestCase):
+
+    def test_views(self):
+        for strip_newlines in (True, False):
+            expected = tokenize_lines(C_SOURCE, strip_newlines, 'c')
+            lines = tokenize_lines(C_SOURCE, strip_newlines, 'c', view=True)
+            assert lines == expected
+            assert len(lines) == len(expected)
+            assert lines[-1] == expected[-1]
+            assert lines[1:3] == expected[1:3]
+            assert lines[2][-1] == expected[2][-1]
+            assert [len(line) for line in lines] == [len(l) for l in expected]
+
+    def test_array(self):
+        lines = tokenize_lines(C_SOURCE, lexer='c', result='array', view=True)
+        assert lines.tokens.source is C_SOURCE
+        assert [[token.as_dict() for token in line] for line in lines] == \
+            tokenize_lines(C_SOURCE, lexer='c')
+
+    def test_list_callers(self):
+        # the way callers of the list of lists walk the lines.
+        found = []
+        for line in tokenize_lines('#include <a.h>\n\nint i;\n', lexer='c',
+                                   view=True):
+            if line:
+                if line[0]['value'] == '#include':
+                    found.append(''.join(token['value'] for token in line))
+        assert found == ['#include <a.h>']
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class NumpyEngineTestCase(unittest.TestCase):
+
+    def test_same_tokens(self):
+        sources = [C_SOURCE, '', 'a1 1a -1 x-1 "s" /', 'x\r\ny\rz\n',
+                   '\u00e9t\u00e9 = 1;', '\u0100 = "\u0100";']
+        for s in sources:
+            for lexer in ('c', 'txt'):
+                assert tokenize(s, lexer, 'numpy') == tokenize(s, lexer), s
+        data = C_SOURCE.encode('utf-8')
+        assert tokenize(memoryview(data), 'c', 'numpy') == tokenize(C_SOURCE, 'c')
+
+    def test_array(self):
+        for s in (C_SOURCE, '', '\u0100 = "\u0100";\n', C_SOURCE.encode()):
+            for kwargs in ({}, {'exclude': {TYPE.WHITESPACE}},
+                           {'include': {TYPE.NUMBER, TYPE.STRING}}):
+                tokens = tokenize(s, 'c', 'numpy', 'array', **kwargs)
+                expected = tokenize(s, 'c', 'python', 'array', **kwargs)
+                assert tokens.to_dicts() == expected.to_dicts()
+                assert (tokens.starts, tokens.ends, tokens.lines) == \
+                    (expected.starts, expected.ends, expected.lines)
+
+    def test_errors(self):
+        with self.assertRaises(LexError) as cm:
+            tokenize('int x;\n  "abc', 'c', 'numpy')
+        assert (cm.exception.row, cm.exception.col) == (2, 3)
+
+    def test_undeclared_first_chars(self):
+        class LexAt:
+            @staticmethod
+            def lex(s, idx, end, ctx):
+                return 1 if s[idx] == '@' else 0
+        lexer = Lexer(lex_string=LexAt)
+        assert tokenize('a@b', lexer, 'numpy') == tokenize('a@b', lexer)
+
+
+class IncludesTestCase(unittest.TestCase):
+
+    def test_find_includes(self):
+        s = ('#include <stdio.h>\n'
+             '  #  include "a.h" // comment\n'
+             '/*\n#include "commented.h"\n*/\n'
+             'const char *s = "\\n#include \\"string.h\\"";\n'
+             '#define X \\\n  1\n'
+             '#include MACRO\n')
+        assert [(i['path'], i['system'], i['line'])
+                for i in includes.find_includes(s)] == \
+            [('stdio.h', True, 1), ('a.h', False, 2)]
+        directives = includes.scan_directives(s)
+        assert [d['name'] for d in directives] == \
+            ['include', 'include', 'define', 'include']
+        assert directives[2]['args'] == 'X \\\n  1'
+
+    def test_include_graph(self):
+        with tempfile.TemporaryDirectory() as directory:
+            def write(name, text):
+                path = os.path.join(directory, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w') as f:
+                    f.write(text)
+                return os.path.normpath(path)
+            main = write('src/main.c', '#include "a.h"\n#include <lib.h>\n'
+                                       '#include <missing.h>\n')
+            a = write('src/a.h', '#include "b.h"\n')
+            b = write('src/b.h', '#include "a.h"\n')
+            lib = write('include/lib.h', '#include <b.h>\n')
+            search_paths = [os.path.join(directory, 'include'),
+                            os.path.join(directory, 'src')]
+            cache = includes.IncludeCache(os.path.join(directory, 'cache.json'))
+
+            graph = includes.include_graph([os.path.join(directory, 'src')],
+                                           search_paths, jobs=1, cache=cache)
+            assert graph.edges[main] == [a, lib]
+            assert graph.unresolved[main] == ['missing.h']
+            assert graph.transitive(main) == {a, b, lib}
+            assert graph.dependents(b) == {main, a, b, lib}
+            assert (cache.hits, cache.misses) == (0, 4)
+            cache.save()
+
+            # only the changed file is scanned again.
+            write('src/b.h', '')
+            cache = includes.IncludeCache(cache.path)
+            graph = includes.include_graph([main], search_paths, jobs=2,
+                                           cache=cache)
+            assert graph.transitive(main) == {a, b, lib}
+            assert graph.edges[b] == []
+            assert (cache.hits, cache.misses) == (3, 1)
+
+
+class AsyncTestCase(unittest.TestCase):
+
+    def test_atokenize(self):
+        tokens = asyncio.run(aio.atokenize(C_SOURCE, 'c', exclude={TYPE.WHITESPACE}))
+        assert tokens == tokenize(C_SOURCE, 'c', exclude={TYPE.WHITESPACE})
+
+    def test_aiter_tokens(self):
+        async def collect(**kwargs):
+            return [token async for token in aio.aiter_tokens(C_SOURCE, 'c', **kwargs)]
+        expected = tokenize(C_SOURCE, 'c')
+        assert asyncio.run(collect()) == expected
+        assert asyncio.run(collect(chunk_size=7, batch_size=3)) == expected
+
+        async def first():
+            tokens = aio.aiter_tokens(C_SOURCE * 100, 'c', chunk_size=64)
+            async for token in tokens:
+                await tokens.aclose()
+                return token
+        assert asyncio.run(first()) == expected[0]
+
+    def test_atokenize_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for i in range(5):
+                paths.append(os.path.join(directory, '%d.c' % i))
+                with open(paths[-1], 'w') as f:
+                    f.write(C_SOURCE * i)
+            paths.append(os.path.join(directory, 'missing.c'))
+
+            async def collect(**kwargs):
+                return [result async for result in
+                        aio.atokenize_files(paths, limit=2, **kwargs)]
+            results = asyncio.run(collect(ordered=True))
+            assert [path for path, tokens, error in results] == paths
+            assert results[3][1].to_dicts() == tokenize(C_SOURCE * 3, 'c')
+            assert isinstance(results[-1][2], OSError)
+            results = asyncio.run(collect())
+            assert sorted(path for path, tokens, error in results) == sorted(paths)
+
+
+PACK_SOURCES = {
+    'python': 'def f(x=0x_ff, *a):  # doc\n    return """a\n\\"""" + r\'\\d\' + 1.5e3j\n',
+    'javascript': 'let s = `a ${b}\n` + "x\\"" + 10n; // end\n/* c */ $x?.y\n',
+    'go': 'func f() rune { return \'\\n\' + `raw\n` + 0x1p-2i } // c\n',
+    'rust': "fn f<'a>(x: &'a str) -> u8 { /* a /* b */ c */ b'x' + 1_000u8 } // c\n",
+    'shell': 'echo "$HOME" \'a b\' 2>&1 # comment\nx=a#b\n',
+    'json': '{"a": [1, -2.5e3, true, null], "b\\"": {}}\n',
+}
+
+class LexerPackTestCase(unittest.TestCase):
+
+    def test_lazy_import(self):
+        import subprocess
+        code = ('import sys, plexer; '
+                'assert "plexer.lexers" not in sys.modules; '
+                'plexer.tokenize("x = 1", "py"); '
+                'assert "plexer.lexers.python" in sys.modules; '
+                'assert "plexer.lexers.rust" not in sys.modules')
+        root = os.path.join(os.path.dirname(__file__), '..')
+        subprocess.check_call([sys.executable, '-c', code], cwd=root)
+
+    def test_packaged(self):
+        # the packs must be importable from a built package, not just from
+        # the source tree.
+        import subprocess
+        try:
+            import setuptools
+        except ImportError:
+            self.skipTest('setuptools is not installed')
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        with tempfile.TemporaryDirectory() as directory:
+            build = os.path.join(directory, 'build')
+            subprocess.check_call(
+                [sys.executable, 'setup.py', '-q', 'build_py',
+                 '--build-lib', build], cwd=root,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            code = ('import plexer, sys; '
+                    'assert plexer.__file__.startswith(sys.argv[1]); '
+                    '[plexer.get_lexer(name) for name in plexer.LEXER_PACKS]')
+            subprocess.check_call([sys.executable, '-c', code, build],
+                                  cwd=directory,
+                                  env=dict(os.environ, PYTHONPATH=build))
+
+    def test_packs(self):
+        for name, source in PACK_SOURCES.items():
+            lexer = plexer.get_lexer(name)
+            tokens = tokenize(source, lexer)
+            assert ''.join(token['value'] for token in tokens) == source
+            for engine in ('regex', 'numpy' if numpy else 'python'):
+                assert tokenize(source, lexer, engine) == tokens, (name, engine)
+        tokens = tokenize(PACK_SOURCES['rust'], 'rs')
+        assert [t['value'] for t in tokens if t['type'] == TYPE.COMMENT] == \
+            ['/* a /* b */ c */', '// c']
+        tokens = tokenize(PACK_SOURCES['shell'], 'sh')
+        assert [t['value'] for t in tokens if t['type'] == TYPE.COMMENT] == \
+            ['# comment']
+
+    def test_delimited_lexer(self):
+        from plexer.lexers import delimited_lexer
+        LexTestComment = delimited_lexer('LexTestComment', '(*', '*)',
+                                         'Unterminated comment')
+        LexTestString = delimited_lexer('LexTestString', "'", "'",
+                                        'String not terminated', escape='\\')
+        lexer = Lexer(lex_comment=LexTestComment, lex_string=LexTestString,
+                      special_chars='(*);')
+        source = "(* a\n (* *) 'b\\'' 'c\\\\' (**);"
+        tokens = tokenize(source, lexer)
+        assert [t['value'] for t in tokens if t['type'] != TYPE.WHITESPACE] == \
+            ['(* a\n (* *)', "'b\\''", "'c\\\\'", '(**)', ';']
+        for engine in ('regex', 'numpy' if numpy else 'python'):
+            assert tokenize(source, lexer, engine) == tokens
+        with self.assertRaises(LexError) as cm:
+            tokenize("'abc\\'", lexer)
+        assert cm.exception.msg == 'String not terminated'
+
+    def test_registry(self):
+        assert isinstance(plexer.LEXERS['json'], (Lexer, plexer.LexerPack))
+        lexer = plexer.get_lexer('json')
+        assert plexer.LEXERS['json'] is lexer
+        assert plexer.get_lexer('JSON') is lexer
+        with self.assertRaises(LexError):
+            plexer.get_lexer('no-such-language')
+        with self.assertRaises(LexError) as cm:
+            tokenize('"abc', 'json')
+        assert cm.exception.msg == 'String not terminated'
+
+    def test_python_triple_quotes(self):
+        # an open triple quote isn't two empty strings.
+        for engine in ('python', 'regex'):
+            for quote in ('"', "'"):
+                with self.assertRaises(LexError) as cm:
+                    tokenize('x = %s\n' % (quote * 4), 'py', engine)
+                assert cm.exception.msg == \
+                    'Triple-quoted string not terminated'
+            values = [token['value'] for token in
+                      tokenize('"" + \'\' + """a""" + "b"', 'py', engine)
+                      if token['type'] == TYPE.STRING]
+            assert values == ['""', "''", '"""a"""', '"b"']
+
+
+class IdentifierIndexTestCase(unittest.TestCase):
+
+    def test_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            a = os.path.join(directory, 'a.c')
+            b = os.path.join(directory, 'b.py')
+            with open(a, 'w') as f:
+                f.write('int x;\n/* y */ int y = x;\n')
+            with open(b, 'w') as f:
+                f.write('x = "y"\n')
+            with open(os.path.join(directory, 'notes.unknown'), 'w') as f:
+                f.write('x')
+
+            index = IdentifierIndex(os.path.join(directory, 'index.pickle'))
+            assert index.update([directory], jobs=1) == 2
+            assert index.lookup('x') == [(a, 1, 5), (a, 2, 17), (b, 1, 1)]
+            assert index.lookup('y') == [(a, 2, 13)]
+            assert 'int' in index and 'z' not in index
+            index.save()
+
+            # only the modified file is indexed again.
+            index = IdentifierIndex(index.path)
+            assert index.lookup('x')[-1] == (b, 1, 1)
+            with open(b, 'w') as f:
+                f.write('\nz = 1\n')
+            os.utime(b, ns=(0, 0))
+            assert index.update([directory], jobs=2) == 1
+            assert index.lookup('x') == [(a, 1, 5), (a, 2, 17)]
+            assert index.lookup('z') == [(b, 2, 1)]
+
+            os.remove(a)
+            assert index.update([directory], jobs=1) == 0
+            assert 'x' not in index and len(index) == 1
+
+
+class FingerprintTestCase(unittest.TestCase):
+
+    FUNCTION = ('int sum(int *values, int count) {\n'
+                '    int total = 0;\n'
+                '    for (int i = 0; i < count; i++)\n'
+                '        total += values[i];\n'
+                '    return total;\n'
+                '}\n')
+
+    def test_normalize(self):
+        tokens = tokenize('x = "a"; // c\n', 'c')
+        assert fingerprint.normalize(tokens) == \
+            [('x', 1), ('=', 1), ('"a"', 1), (';', 1)]
+        assert fingerprint.normalize(tokens, identifiers=True,
+                                     literals=True) == \
+            [(TYPE.IDENTIFIER, 1), ('=', 1), (TYPE.STRING, 1), (';', 1)]
+        array = tokenize('x = "a"; // c\n', 'c', result='array')
+        assert fingerprint.normalize(array) == fingerprint.normalize(tokens)
+
+    def test_fingerprints(self):
+        selected = fingerprint.fingerprints(tokenize(self.FUNCTION, 'c'))
+        assert selected and selected[0][2] >= 1 and selected[-1][3] <= 6
+        positions = [position for h, position, first, last in selected]
+        assert positions == sorted(set(positions))
+        # formatting and comments don't matter.
+        reformatted = self.FUNCTION.replace('\n    ', ' /* x */\n\t')
+        assert fingerprint.fingerprints(tokenize(reformatted, 'c')) == selected
+        assert fingerprint.fingerprints(tokenize('x;', 'c')) == []
+
+    def test_index(self):
+        renamed = self.FUNCTION.replace('total', 'acc').replace('values', 'v')
+        with tempfile.TemporaryDirectory() as directory:
+            a = os.path.join(directory, 'a.c')
+            b = os.path.join(directory, 'b.c')
+            with open(a, 'w') as f:
+                f.write('int unrelated(void) { return 42; }\n' + self.FUNCTION)
+            with open(b, 'w') as f:
+                f.write(renamed)
+
+            path = os.path.join(directory, 'index.pickle')
+            index = fingerprint.FingerprintIndex(path, identifiers=True)
+            assert index.update([directory], jobs=1) == 2
+            (first, match), = index.duplicates(min_fingerprints=2)
+            assert first == a and match['path'] == b
+            assert match['query_lines'][0] >= 2 and match['lines'][0] >= 1
+            assert match['query_lines'][1] - match['query_lines'][0] == \
+                match['lines'][1] - match['lines'][0]
+            index.save()
+
+            # renamed identifiers only match when they are abstracted.
+            index = fingerprint.FingerprintIndex(path)
+            assert len(index) == 0
+            index.update([directory], jobs=1)
+            assert index.duplicates(min_fingerprints=2) == []
+
+            index = fingerprint.FingerprintIndex(path, identifiers=True)
+            assert len(index) == 2 and a in index
+            query = fingerprint.fingerprints(tokenize(renamed, 'c'),
+                                             identifiers=True)
+            assert {m['path'] for m in index.matches(query)} == {a, b}
+            assert [m['path'] for m in index.matches(query, exclude=b)] == [a]
+            os.remove(b)
+            assert index.update([directory], jobs=1) == 0
+            assert index.duplicates() == [] and len(index) == 1
+
+    def test_readd(self):
+        index = fingerprint.FingerprintIndex(identifiers=True)
+        renamed = self.FUNCTION.replace('total', 'acc')
+        for _ in range(5):
+            index.add('a.c', tokenize(self.FUNCTION, 'c'))
+            index.add('b.c', tokenize(renamed, 'c'))
+            index.remove('b.c')
+            index.add('b.c', tokenize(renamed, 'c'))
+        # the ids of replaced and removed files are reused.
+        assert len(index._paths) == 2
+        (first, match), = index.duplicates(min_fingerprints=2)
+        assert (first, match['path']) == ('a.c', 'b.c')
+
+
+class BinaryFormatTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        source = C_SOURCE + 'char *s = "\u00fc\u00df"; // \u00e9\n'
+        expected = tokenize(source, 'c')
+        tokens = tokenize(source, 'c', result='array')
+        for data in (binary.dumps(tokens), binary.dumps(expected)):
+            reader = binary.loads(data)
+            assert reader.to_dicts() == expected
+            assert [token.value for token in reader[-4:]] == \
+                [token['value'] for token in expected[-4:]]
+            assert reader.lines[-1] == expected[-1]['line']
+        # columns count bytes.
+        tokens = tokenize(source.encode('utf-8'), 'c', result='array')
+        assert binary.loads(binary.dumps(tokens)).to_dicts() == tokens.to_dicts()
+        assert binary.loads(binary.dumps(tokens)).fingerprint == \
+            plexer.LEXERS['c'].fingerprint()
+
+    def test_no_strings(self):
+        tokens = tokenize(C_SOURCE, 'c', result='array')
+        reader = binary.loads(binary.dumps(tokens, strings=False))
+        assert reader.strings is None and reader.value(0) is None
+        assert list(reader.types) == list(tokens.types)
+        assert list(reader.columns) == list(tokens.columns)
+        assert reader[0].value is None and reader[0].name == 'identifier'
+        assert [token.value for token in reader] == [None] * len(tokens)
+        assert [(token.type, token.line, token.column) for token in reader] \
+            == list(zip(tokens.types, tokens.lines, tokens.columns))
+        assert 'None' in repr(reader[-1])
+        assert reader.to_dicts()[0]['value'] is None
+
+    def test_bytes(self):
+        source = C_SOURCE.encode('utf-8') + b'char *s = "\xff\xfe";\n'
+        tokens = tokenize(source, 'c', result='array', encoding=None)
+        reader = binary.loads(binary.dumps(tokens))
+        assert reader.encoding is None
+        assert [token.value for token in reader] == \
+            [token['value'] for token in tokens.to_dicts()]
+        assert all(type(reader[i].value) is bytes and
+                   reader[i].value == reader.value(i)
+                   for i in range(len(reader)))
+        assert reader[-3].value == b'"\xff\xfe"'
+        assert repr(reader[-3]) == repr(tokens[-3])
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tokens.bin')
+            with open(path, 'wb') as f:
+                binary.dump(tokenize(C_SOURCE, 'c', result='array'), f)
+            reader = binary.load(path)
+            assert reader.to_dicts() == tokenize(C_SOURCE, 'c')
+            del reader
+        with self.assertRaises(ValueError):
+            binary.loads(b'not a token stream')
+
+    def test_frames(self):
+        f = io.BytesIO()
+        binary.dump_frame(f, 'a.c', tokenize(C_SOURCE, 'c', result='array'))
+        binary.dump_frame(f, 'b.c', tokenize('x;', 'c', result='array'))
+        f.seek(0)
+        frames = list(binary.iter_frames(f))
+        assert [name for name, reader in frames] == ['a.c', 'b.c']
+        assert frames[0][1].to_dicts() == tokenize(C_SOURCE, 'c')
+        assert [token.value for token in frames[1][1]] == ['x', ';']
+        with self.assertRaises(ValueError):
+            list(binary.iter_frames(io.BytesIO(f.getvalue()[:-1])))
+
+
+class ErrorRecoveryTestCase(unittest.TestCase):
+
+    SOURCE = 'int a;\nchar *s = "abc;\nx /* open\ny = 2;\n'
+
+    def test_recover(self):
+        diagnostics = []
+        tokens = tokenize(self.SOURCE, 'c', diagnostics=diagnostics)
+        values = [(token['name'], token['value']) for token in tokens
+                  if token['type'] not in (TYPE.NEWLINE, TYPE.WHITESPACE)]
+        assert values[6:] == [
+            ('special', '='), ('error', '"abc;'), ('identifier', 'x'),
+            ('error', '/* open'), ('identifier', 'y'), ('special', '='),
+            ('number', '2'), ('special', ';')]
+        assert [(e.msg, e.row, e.col) for e in diagnostics] == [
+            ('String not terminated', 2, 11),
+            ('Unterminated C block comment', 3, 3)]
+        with self.assertRaises(LexError):
+            tokenize(self.SOURCE, 'c')
+
+    def test_engines(self):
+        engines = ['regex'] + (['numpy'] if numpy is not None else [])
+        expected = tokenize(self.SOURCE, 'c', diagnostics=[])
+        for engine in engines:
+            diagnostics = []
+            assert tokenize(self.SOURCE, 'c', engine,
+                            diagnostics=diagnostics) == expected, engine
+            assert len(diagnostics) == 2
+            tokens = tokenize(self.SOURCE.encode('utf-8'), 'c', engine,
+                              diagnostics=[])
+            assert tokens == expected, engine
+
+    def test_array(self):
+        tokens = tokenize(self.SOURCE, 'c', result='array', diagnostics=[])
+        assert [e.msg for e in tokens.diagnostics] == [
+            'String not terminated', 'Unterminated C block comment']
+        assert tokenize(C_SOURCE, 'c', result='array',
+                        diagnostics=[]).diagnostics == []
+        assert tokenize(C_SOURCE, 'c', result='array').diagnostics is None
+
+    def test_retokenize(self):
+        source = self.SOURCE * 3
+        tokens = tokenize(source, 'c', result='array', diagnostics=[])
+        for offset, removed_len, inserted_text in [
+                (0, 0, 'x'), (0, 0, '\n\n'), (len(source), 0, '"'),
+                (19, 0, '"'), (27, 0, '*/'), (27, 1, ''), (40, 10, '')]:
+            new = retokenize(tokens, offset, removed_len, inserted_text)
+            diagnostics = []
+            expected = tokenize(new.source, 'c', diagnostics=diagnostics)
+            assert new.to_dicts() == expected
+            assert [(e.msg, e.row, e.col) for e in new.diagnostics] == \
+                [(e.msg, e.row, e.col) for e in diagnostics]
+        # an array lexed without recovering raises as before.
+        with self.assertRaises(LexError):
+            retokenize(tokens, 0, 0, '/*', recover=False)
+        tokens = tokenize(C_SOURCE, 'c', result='array')
+        with self.assertRaises(LexError):
+            retokenize(tokens, len(C_SOURCE), 0, '/*')
+        new = retokenize(tokens, len(C_SOURCE), 0, '/*', recover=True)
+        assert [e.msg for e in new.diagnostics] == [
+            'Unterminated C block comment']
+        # an array lexed while recovering keeps recovering, even without
+        # any errors yet.
+        tokens = tokenize('int x;\nint y;\n', 'c', result='array',
+                          diagnostics=[])
+        new = retokenize(tokens, 7, 0, '"x\n')
+        diagnostics = []
+        assert new.to_dicts() == tokenize(new.source, 'c',
+                                          diagnostics=diagnostics)
+        assert [e.msg for e in new.diagnostics] == \
+            [e.msg for e in diagnostics] == ['String not terminated']
+
+    def test_tokenize_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.c')
+            with open(path, 'w') as f:
+                f.write(self.SOURCE)
+            (_, tokens, error), = tokenize_files([path], jobs=1, recover=True)
+            assert error is None and len(tokens.diagnostics) == 2
+            (_, tokens, error), = tokenize_files([path], jobs=1)
+            assert tokens is None and isinstance(error, LexError)
+
+
+class CommandLineTestCase(unittest.TestCase):
+
+    def run_main(self, *argv):
+        stdout = io.TextIOWrapper(io.BytesIO())
+        stderr = io.StringIO()
+        with mock.patch('sys.stdout', stdout), mock.patch('sys.stderr', stderr):
+            status = plexer_main.main(['-j', '1'] + list(argv))
+        return status, stdout.buffer.getvalue(), stderr.getvalue()
+
+    def test_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.c')
+            with open(path, 'w') as f:
+                f.write(C_SOURCE)
+            with open(os.path.join(directory, 'notes.unknown'), 'w') as f:
+                f.write('skipped')
+            with open(os.path.join(directory, 'Makefile'), 'w') as f:
+                f.write('"skipped')
+            os.makedirs(os.path.join(directory, '.git', 'objects'))
+            with open(os.path.join(directory, '.git', 'objects', 'ab'),
+                      'wb') as f:
+                f.write(b'\xff"skipped')
+            with open(os.path.join(directory, '.git', 'b.c'), 'w') as f:
+                f.write('"skipped')
+            status, out, err = self.run_main(directory, '--exclude',
+                                             'whitespace,newline')
+        assert status == 0
+        assert '1 files' in err and '0 errors' in err
+        expected = [dict(token, path=path)
+                    for token in tokenize(C_SOURCE, 'c', exclude={0, 1})]
+        assert [json.loads(line) for line in out.splitlines()] == expected
+
+    def test_binary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.c')
+            with open(path, 'w') as f:
+                f.write(C_SOURCE)
+            status, out, err = self.run_main(path, '--format', 'binary',
+                                             '--include', 'identifier', '-q')
+        assert status == 0 and err == ''
+        (name, reader), = binary.iter_frames(io.BytesIO(out))
+        assert name == path
+        assert reader.to_dicts() == tokenize(C_SOURCE, 'c', include={6})
+
+    def test_errors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            good = os.path.join(directory, 'a.c')
+            bad = os.path.join(directory, 'b.c')
+            with open(good, 'w') as f:
+                f.write('x;')
+            with open(bad, 'w') as f:
+                f.write('"unterminated\n')
+            status, out, err = self.run_main(directory)
+            assert status == 1
+            assert bad + ': ' in err and '1 errors' in err
+            assert len(out.splitlines()) == 2
+
+            status, out, err = self.run_main(directory, '--recover',
+                                             '--include', 'error')
+        assert status == 0
+        assert bad + ':1:1: warning: String not terminated' in err
+        assert json.loads(out)['value'] == '"unterminated'
+
+
+
+class BenchmarksTestCase(unittest.TestCase):
+
+    def result(self, **changes):
+        result = {'corpus': 'mixed', 'lexer': 'c', 'function': 'tokenize',
+                  'engine': 'regex', 'chars': 1000, 'tokens_per_sec': 1000.0,
+                  'peak_bytes': 1000}
+        result.update(changes)
+        return result
+
+    def test_compare(self):
+        baseline = {'results': [self.result()]}
+        assert benchmarks_main.compare([self.result()], baseline, 0.1) == []
+        assert benchmarks_main.compare(
+            [self.result(tokens_per_sec=950.0)], baseline, 0.1) == []
+        slower = benchmarks_main.compare(
+            [self.result(tokens_per_sec=800.0)], baseline, 0.1)
+        assert slower == ['mixed/c/tokenize/regex: 800 tok/s, was 1000']
+        larger = benchmarks_main.compare(
+            [self.result(peak_bytes=2000)], baseline, 0.1)
+        assert larger == ['mixed/c/tokenize/regex: 2000 bytes peak, was 1000']
+
+    def test_compare_other_corpus(self):
+        # results measured on a corpus of another size aren't compared.
+        baseline = {'results': [self.result()]}
+        assert benchmarks_main.compare(
+            [self.result(chars=2000, tokens_per_sec=100.0)], baseline,
+            0.1) == []
+        assert benchmarks_main.compare(
+            [self.result(engine='python', tokens_per_sec=100.0)], baseline,
+            0.1) == []
+
+    def test_corpus_deterministic(self):
+        for name in corpus.names():
+            s = corpus.generate(name, 2000, 1)
+            assert s == corpus.generate(name, 2000, 1), name
+            assert len(s) >= 2000, name
+        assert corpus.generate('mixed', 2000, 1) != \
+            corpus.generate('mixed', 2000, 2)
+
 
 # def suite():
 #     import print_c_includes_tests